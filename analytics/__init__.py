@@ -0,0 +1,39 @@
+import numpy as np
+import numpy.typing as npt
+
+earth_radius = 6371008.8
+
+
+def project(
+    longitude: npt.NDArray[np.float64],
+    latitude: npt.NDArray[np.float64],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    scale = np.cos(np.radians(latitude.mean())) if len(latitude) != 0 else 1.0
+    return (
+        np.radians(longitude) * scale * earth_radius,
+        np.radians(latitude) * earth_radius,
+    )
+
+
+def haversine(
+    longitude1: npt.NDArray[np.float64],
+    latitude1: npt.NDArray[np.float64],
+    longitude2: npt.NDArray[np.float64],
+    latitude2: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    longitude1, latitude1, longitude2, latitude2 = map(
+        np.radians, (longitude1, latitude1, longitude2, latitude2)
+    )
+    a = (
+        np.sin((latitude2 - latitude1) / 2) ** 2
+        + np.cos(latitude1)
+        * np.cos(latitude2)
+        * np.sin((longitude2 - longitude1) / 2) ** 2
+    )
+    return 2 * earth_radius * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+from . import track
+from . import cell
+from . import course
+from . import trip
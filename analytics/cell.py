@@ -0,0 +1,114 @@
+import math
+
+import analytics
+
+bits = 16
+masks = ((8, 0x00FF00FF), (4, 0x0F0F0F0F), (2, 0x33333333), (1, 0x55555555))
+
+
+def quantize(value: float, low: float, high: float) -> int:
+    return min(
+        max(math.floor((value - low) / (high - low) * (1 << bits)), 0), (1 << bits) - 1
+    )
+
+
+def spread(value: int) -> int:
+    for shift, mask in masks:
+        value = (value | (value << shift)) & mask
+    return value
+
+
+def interleave(x: int, y: int) -> int:
+    return spread(x) | (spread(y) << 1)
+
+
+def encode(longitude: float, latitude: float) -> int:
+    return interleave(quantize(longitude, -180, 180), quantize(latitude, -90, 90))
+
+
+def merge(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for low, high in sorted(ranges):
+        if len(merged) != 0 and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def cover(
+    west: float,
+    south: float,
+    east: float,
+    north: float,
+    max_ranges: int = 32,
+) -> list[tuple[int, int]]:
+    if west > east:
+        return merge(
+            cover(west, south, 180, north, max_ranges // 2)
+            + cover(-180, south, east, north, max_ranges // 2)
+        )
+
+    x0, x1 = quantize(west, -180, 180), quantize(east, -180, 180)
+    y0, y1 = quantize(south, -90, 90), quantize(north, -90, 90)
+
+    ranges: list[tuple[int, int]] = []
+    partial = [(0, 0)]
+
+    for level in range(bits + 1):
+        shift = bits - level
+        size = 1 << (2 * shift)
+        overlapping = []
+
+        for x, y in partial:
+            low_x, high_x = x << shift, ((x + 1) << shift) - 1
+            low_y, high_y = y << shift, ((y + 1) << shift) - 1
+
+            if high_x < x0 or low_x > x1 or high_y < y0 or low_y > y1:
+                continue
+
+            if x0 <= low_x and high_x <= x1 and y0 <= low_y and high_y <= y1:
+                ranges.append(
+                    (interleave(x, y) * size, (interleave(x, y) + 1) * size - 1)
+                )
+            else:
+                overlapping.append((x, y))
+
+        if len(ranges) + 4 * len(overlapping) > max_ranges:
+            ranges.extend(
+                (interleave(x, y) * size, (interleave(x, y) + 1) * size - 1)
+                for x, y in overlapping
+            )
+            break
+
+        partial = [
+            (2 * x + dx, 2 * y + dy)
+            for x, y in overlapping
+            for dx in (0, 1)
+            for dy in (0, 1)
+        ]
+
+    return merge(ranges)
+
+
+def around(
+    longitude: float,
+    latitude: float,
+    radius: float,
+) -> tuple[float, float, float, float]:
+    delta_latitude = math.degrees(radius / analytics.earth_radius)
+    south = max(latitude - delta_latitude, -90)
+    north = min(latitude + delta_latitude, 90)
+
+    scale = math.cos(math.radians(max(abs(south), abs(north))))
+    if (
+        south == -90
+        or north == 90
+        or radius >= scale * analytics.earth_radius * math.pi
+    ):
+        return -180, south, 180, north
+
+    delta_longitude = math.degrees(radius / (analytics.earth_radius * scale))
+    west = (longitude - delta_longitude + 540) % 360 - 180
+    east = (longitude + delta_longitude + 540) % 360 - 180
+    return west, south, east, north
@@ -0,0 +1,167 @@
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from analytics import earth_radius
+
+
+class Position(NamedTuple):
+    distance: float
+    progress: float
+    remaining: float
+
+
+class Course:
+    def __init__(self, waypoints: list[tuple[float, float]]) -> None:
+        longitude = np.array([waypoint[0] for waypoint in waypoints], dtype=np.float64)
+        latitude = np.array([waypoint[1] for waypoint in waypoints], dtype=np.float64)
+        if len(waypoints) == 1:
+            longitude = np.repeat(longitude, 2)
+            latitude = np.repeat(latitude, 2)
+
+        self.origin = float(longitude[0])
+        longitude = self.origin + np.cumsum(
+            np.concatenate([[0], (np.diff(longitude) + 180) % 360 - 180])
+        )
+        self.center = float(longitude.mean())
+        self.scale = math.cos(math.radians(float(latitude.mean())))
+
+        x, y = self.project_many(longitude, latitude)
+        dx, dy = np.diff(x), np.diff(y)
+        length = np.hypot(dx, dy)
+        self.length = float(length.sum())
+        self.start = np.concatenate([[0], np.cumsum(length)[:-1]])
+        self.ax, self.ay, self.dx, self.dy = x[:-1], y[:-1], dx, dy
+        self.squared = length * length
+
+        self.end = (float(x[-1]), float(y[-1]))
+        self.segments = list(
+            zip(
+                *[
+                    array.tolist()
+                    for array in (
+                        self.ax,
+                        self.ay,
+                        self.dx,
+                        self.dy,
+                        self.squared,
+                        self.start,
+                        length,
+                    )
+                ]
+            )
+        )
+
+        self.cell = max(
+            self.length / len(self.segments),
+            float(length.max()) / 16,
+            1.0,
+        )
+        self.grid: dict[tuple[int, int], list[int]] = {}
+        low_x = np.floor(np.minimum(x[:-1], x[1:]) / self.cell).astype(int)
+        high_x = np.floor(np.maximum(x[:-1], x[1:]) / self.cell).astype(int)
+        low_y = np.floor(np.minimum(y[:-1], y[1:]) / self.cell).astype(int)
+        high_y = np.floor(np.maximum(y[:-1], y[1:]) / self.cell).astype(int)
+
+        for index, (x0, x1, y0, y1) in enumerate(
+            zip(low_x.tolist(), high_x.tolist(), low_y.tolist(), high_y.tolist())
+        ):
+            for i in range(x0, x1 + 1):
+                for j in range(y0, y1 + 1):
+                    self.grid.setdefault((i, j), []).append(index)
+
+        self.bounds = (
+            int(low_x.min()),
+            int(high_x.max()),
+            int(low_y.min()),
+            int(high_y.max()),
+        )
+
+    def project_many(
+        self,
+        longitude: np.ndarray,
+        latitude: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        return (
+            np.radians(longitude - self.center) * self.scale * earth_radius,
+            np.radians(latitude) * earth_radius,
+        )
+
+    def project(self, longitude: float, latitude: float) -> tuple[float, float]:
+        longitude = self.center + (longitude - self.center + 180) % 360 - 180
+        return (
+            math.radians(longitude - self.center) * self.scale * earth_radius,
+            math.radians(latitude) * earth_radius,
+        )
+
+    def measure(self, index: int, x: float, y: float) -> tuple[float, float]:
+        ax, ay, dx, dy, squared, start, length = self.segments[index]
+        t = 0.0 if squared == 0 else ((x - ax) * dx + (y - ay) * dy) / squared
+        t = min(max(t, 0.0), 1.0)
+        return math.hypot(x - ax - t * dx, y - ay - t * dy), start + t * length
+
+    def nearest(self, x: float, y: float) -> tuple[float, float]:
+        ex, ey = x - self.ax, y - self.ay
+        t = np.divide(
+            ex * self.dx + ey * self.dy,
+            self.squared,
+            out=np.zeros_like(self.squared),
+            where=self.squared > 0,
+        ).clip(0, 1)
+        distance = np.hypot(ex - t * self.dx, ey - t * self.dy)
+        index = int(distance.argmin())
+        return float(distance[index]), float(
+            self.start[index] + t[index] * math.sqrt(self.squared[index])
+        )
+
+    def locate(self, longitude: float, latitude: float) -> Position:
+        x, y = self.project(longitude, latitude)
+        i, j = math.floor(x / self.cell), math.floor(y / self.cell)
+        low_x, high_x, low_y, high_y = self.bounds
+        rings = max(low_x - i, i - high_x, low_y - j, j - high_y, 0)
+
+        if rings > 4:
+            distance, along = self.nearest(x, y)
+        else:
+            distance, along = math.inf, 0.0
+            checked: set[int] = set()
+            limit = max(high_x - low_x, high_y - low_y) + rings + 1
+            edge = min(
+                x - i * self.cell,
+                (i + 1) * self.cell - x,
+                y - j * self.cell,
+                (j + 1) * self.cell - y,
+            )
+
+            for ring in range(limit + 1):
+                for cell in self.ring(i, j, ring):
+                    for index in self.grid.get(cell, ()):
+                        if index in checked:
+                            continue
+
+                        checked.add(index)
+                        candidate, position = self.measure(index, x, y)
+                        if candidate < distance:
+                            distance, along = candidate, position
+
+                if distance <= edge + ring * self.cell:
+                    break
+
+        return Position(
+            distance=distance,
+            progress=1.0 if self.length == 0 else along / self.length,
+            remaining=math.hypot(x - self.end[0], y - self.end[1]),
+        )
+
+    @staticmethod
+    def ring(i: int, j: int, ring: int) -> list[tuple[int, int]]:
+        if ring == 0:
+            return [(i, j)]
+
+        return [
+            *[(i + offset, j - ring) for offset in range(-ring, ring + 1)],
+            *[(i + offset, j + ring) for offset in range(-ring, ring + 1)],
+            *[(i - ring, j + offset) for offset in range(-ring + 1, ring)],
+            *[(i + ring, j + offset) for offset in range(-ring + 1, ring)],
+        ]
@@ -0,0 +1,105 @@
+import numpy as np
+import numpy.typing as npt
+
+from analytics import project
+
+
+def segment_distance_squared(
+    ex: npt.NDArray[np.float64],
+    ey: npt.NDArray[np.float64],
+    dx: npt.NDArray[np.float64],
+    dy: npt.NDArray[np.float64],
+    scale: npt.NDArray[np.float64] | None = None,
+) -> npt.NDArray[np.float64]:
+    if scale is None:
+        length = dx * dx + dy * dy
+        scale = np.divide(1, length, out=np.zeros_like(length), where=length > 0)
+
+    t = np.clip((ex * dx + ey * dy) * scale, 0, 1)
+    rx = ex - t * dx
+    ry = ey - t * dy
+    return rx * rx + ry * ry
+
+
+def importance(
+    longitude: npt.NDArray[np.float64],
+    latitude: npt.NDArray[np.float64],
+    tolerance: float = 0,
+    points: int | None = None,
+) -> npt.NDArray[np.float64]:
+    x, y = project(longitude, latitude)
+    result = np.zeros(len(x))
+    if len(x) == 0:
+        return result
+
+    result[0] = result[-1] = np.inf
+    starts = np.array([0])
+    ends = np.array([len(x) - 1])
+    limits = np.array([np.inf])
+
+    found = np.array([np.inf, np.inf])
+
+    while True:
+        threshold = tolerance
+        if points is not None and len(found) >= points:
+            threshold = max(threshold, np.partition(found, -points)[-points])
+
+        interior = ends - starts - 1
+        mask = (interior > 0) & (limits >= threshold) & (limits > 0)
+        starts, ends, limits, interior = (
+            starts[mask],
+            ends[mask],
+            limits[mask],
+            interior[mask],
+        )
+        if len(starts) == 0:
+            return result
+
+        segment = np.repeat(np.arange(len(starts)), interior)
+        offsets = np.concatenate(([0], np.cumsum(interior)[:-1]))
+        indices = starts[segment] + np.arange(len(segment)) - offsets[segment] + 1
+
+        dx = x[ends] - x[starts]
+        dy = y[ends] - y[starts]
+        length = dx * dx + dy * dy
+        scale = np.divide(1, length, out=np.zeros_like(length), where=length > 0)
+
+        distance = segment_distance_squared(
+            x[indices] - x[starts][segment],
+            y[indices] - y[starts][segment],
+            dx[segment],
+            dy[segment],
+            scale[segment],
+        )
+
+        maximum = np.maximum.reduceat(distance, offsets)
+        hits = np.flatnonzero(distance == maximum[segment])
+        hits = hits[np.concatenate(([True], np.diff(segment[hits]) != 0))]
+        splits = indices[hits]
+        result[splits] = np.minimum(np.sqrt(maximum), limits)
+        found = np.concatenate((found, result[splits]))
+
+        starts, ends, limits = (
+            np.concatenate((starts, splits)),
+            np.concatenate((splits, ends)),
+            np.concatenate((result[splits], result[splits])),
+        )
+
+
+def simplify(
+    longitude: npt.NDArray[np.float64],
+    latitude: npt.NDArray[np.float64],
+    tolerance: float | None = None,
+    points: int | None = None,
+) -> npt.NDArray[np.intp]:
+    weights = importance(longitude, latitude, tolerance or 0, points)
+
+    if points is not None and points < len(weights):
+        keep = np.argpartition(-weights, points - 1)[:points]
+    else:
+        keep = np.arange(len(weights))
+
+    if tolerance is not None:
+        keep = keep[weights[keep] >= tolerance]
+
+    return np.sort(keep)
@@ -0,0 +1,99 @@
+import numpy as np
+import numpy.typing as npt
+
+from analytics import haversine
+
+sample_dtype = np.dtype(
+    [
+        ("id", np.int64),
+        ("time", np.int64),
+        ("longitude", np.float64),
+        ("latitude", np.float64),
+        ("velocity", np.float64),
+        ("voltage", np.float64),
+    ]
+)
+
+
+def get_dtype(curve_points: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("start_id", np.int64),
+            ("end_id", np.int64),
+            ("departure", np.int64),
+            ("arrival", np.int64),
+            ("points", np.int64),
+            ("distance", np.float64),
+            ("mean_velocity", np.float64),
+            ("max_velocity", np.float64),
+            ("start_voltage", np.float64),
+            ("end_voltage", np.float64),
+            ("min_voltage", np.float64),
+            ("voltage_curve", np.float64, (curve_points,)),
+        ]
+    )
+
+
+def segment(
+    time: npt.NDArray[np.int64],
+    velocity: npt.NDArray[np.float64],
+    moving_velocity: float,
+    dwell_time: float,
+) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+    moving = np.flatnonzero(velocity >= moving_velocity)
+    if len(moving) == 0:
+        return moving, moving
+
+    breaks = np.flatnonzero(np.diff(time[moving]) > dwell_time * 1e6)
+    starts = moving[np.concatenate(([0], breaks + 1))]
+    ends = moving[np.concatenate((breaks, [len(moving) - 1]))]
+    return starts, ends
+
+
+def summarize(
+    samples: npt.NDArray[np.void],
+    starts: npt.NDArray[np.intp],
+    ends: npt.NDArray[np.intp],
+    curve_points: int,
+) -> npt.NDArray[np.void]:
+    trips = np.zeros(len(starts), get_dtype(curve_points))
+    if len(starts) == 0:
+        return trips
+
+    time = samples["time"]
+    longitude = samples["longitude"]
+    latitude = samples["latitude"]
+    voltage = samples["voltage"]
+
+    travelled = np.concatenate(
+        (
+            [0],
+            np.cumsum(
+                haversine(longitude[:-1], latitude[:-1], longitude[1:], latitude[1:])
+            ),
+        )
+    )
+
+    count = ends - starts + 1
+    offsets = np.concatenate(([0], np.cumsum(count)[:-1]))
+    indices = np.repeat(starts - offsets, count) + np.arange(count.sum())
+    velocity = samples["velocity"][indices]
+
+    trips["start_id"] = samples["id"][starts]
+    trips["end_id"] = samples["id"][ends]
+    trips["departure"] = time[starts]
+    trips["arrival"] = time[ends]
+    trips["points"] = count
+    trips["distance"] = travelled[ends] - travelled[starts]
+    trips["mean_velocity"] = np.add.reduceat(velocity, offsets) / count
+    trips["max_velocity"] = np.maximum.reduceat(velocity, offsets)
+    trips["start_voltage"] = voltage[starts]
+    trips["end_voltage"] = voltage[ends]
+    trips["min_voltage"] = np.minimum.reduceat(voltage[indices], offsets)
+
+    grid = time[starts, None] + np.outer(
+        time[ends] - time[starts], np.linspace(0, 1, curve_points)
+    )
+    trips["voltage_curve"] = np.interp(grid, time, voltage)
+
+    return trips
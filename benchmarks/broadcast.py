@@ -0,0 +1,56 @@
+import argparse
+import time
+from datetime import datetime
+
+# isort: off
+import environment
+import models
+import pubsub
+
+telemetry = models.telemetry.Telemetry(
+    id=1,
+    ship_id=1,
+    datetime=datetime(2023, 7, 1, 12, 0, 0),
+    longitude=30.315868,
+    latitude=59.939095,
+    angle=137.5,
+    temperature=21.4,
+    voltage=12.6,
+    velocity=3.2,
+)
+
+
+def per_subscriber(subscribers: int, events: int) -> float:
+    start = time.perf_counter()
+    for _ in range(events):
+        for _ in range(subscribers):
+            telemetry.json()
+    return time.perf_counter() - start
+
+
+def serialize_once(subscribers: int, events: int) -> float:
+    pool = pubsub.Pool(f"benchmark-{subscribers}", events, "drop_oldest")
+    for _ in range(subscribers):
+        pool.subscribe(telemetry.ship_id)
+
+    start = time.perf_counter()
+    for _ in range(events):
+        pool.deliver(telemetry.ship_id, telemetry.dumps())
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+
+    print(f"{'subscribers':>11} {'per subscriber us':>18} {'serialize once us':>18}")
+    for subscribers in args.subscribers:
+        old = per_subscriber(subscribers, args.events) / args.events * 1e6
+        new = serialize_once(subscribers, args.events) / args.events * 1e6
+        print(f"{subscribers:>11} {old:>18.1f} {new:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analytics
+
+
+def route(waypoints: int) -> list[tuple[float, float]]:
+    longitude, latitude, heading = 30.0, 60.0, 0.0
+    result = []
+    for _ in range(waypoints):
+        heading += random.uniform(-0.2, 0.2)
+        longitude += 0.02 * math.cos(heading)
+        latitude += 0.01 * math.sin(heading)
+        result.append((longitude, latitude))
+    return result
+
+
+def points(
+    waypoints: list[tuple[float, float]], count: int
+) -> list[tuple[float, float]]:
+    return [
+        (
+            longitude + random.uniform(-0.005, 0.005),
+            latitude + random.uniform(-0.003, 0.003),
+        )
+        for longitude, latitude in random.choices(waypoints, k=count)
+    ]
+
+
+def brute_force(
+    course: analytics.course.Course, samples: list[tuple[float, float]]
+) -> float:
+    start = time.perf_counter()
+    for longitude, latitude in samples:
+        course.nearest(*course.project(longitude, latitude))
+    return time.perf_counter() - start
+
+
+def indexed(
+    course: analytics.course.Course, samples: list[tuple[float, float]]
+) -> float:
+    start = time.perf_counter()
+    for longitude, latitude in samples:
+        course.locate(longitude, latitude)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument(
+        "--waypoints", type=int, nargs="+", default=[10, 100, 1000, 10000]
+    )
+    args = parser.parse_args()
+    random.seed(0)
+
+    print(f"{'waypoints':>9} {'build ms':>9} {'brute force us':>15} {'indexed us':>11}")
+    for count in args.waypoints:
+        waypoints = route(count)
+
+        start = time.perf_counter()
+        course = analytics.course.Course(waypoints)
+        build = (time.perf_counter() - start) * 1e3
+
+        samples = points(waypoints, args.points)
+        old = brute_force(course, samples) / args.points * 1e6
+        new = indexed(course, samples) / args.points * 1e6
+        print(f"{count:>9} {build:>9.1f} {old:>15.1f} {new:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
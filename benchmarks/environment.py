@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+application_database = os.environ.get("DATABASE")
+os.environ["DATABASE"] = os.environ.get(
+    "BENCHMARK_DATABASE", "postgresql+asyncpg://benchmark@localhost/benchmark"
+)
+os.environ.setdefault("SECRET", "benchmark")
+os.environ.setdefault("PORT", "0")
+os.environ.setdefault("ROOT_PATH", "")
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Callable
+
+# isort: off
+import environment
+from sqlalchemy import Select, and_, select
+from sqlalchemy.orm import joinedload
+
+import database
+import models
+from database.ship import Ship
+from database.telemetry import Telemetry
+from database.user import User
+from service import load_history, reset, summarize
+
+
+def before(user_id: int, ship_id: int, limit: int) -> Select[Any]:
+    return (
+        select(Telemetry)
+        .options(joinedload(Telemetry.ship).joinedload(Ship.owner))
+        .join(Ship)
+        .where(and_(Telemetry.ship_id == ship_id, Ship.owner_id == user_id))
+        .order_by(Telemetry.datetime.desc(), Telemetry.id.desc())
+        .limit(limit)
+    )
+
+
+def after(user_id: int, ship_id: int, limit: int) -> Select[Any]:
+    return (
+        select(*database.telemetry.fields)
+        .join(Ship)
+        .where(and_(Telemetry.ship_id == ship_id, Ship.owner_id == user_id))
+        .order_by(Telemetry.datetime.desc(), Telemetry.id.desc())
+        .limit(limit)
+    )
+
+
+async def measure(
+    build: Callable[[int, int, int], Select[Any]],
+    entity: bool,
+    user_id: int,
+    ship_id: int,
+    limit: int,
+    repeats: int,
+) -> dict[str, float]:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        async with database.sessions.begin() as session:
+            statement = build(user_id, ship_id, limit)
+            rows = (
+                (await session.scalars(statement)).unique().all()
+                if entity
+                else (await session.execute(statement)).all()
+            )
+            result = [models.telemetry.Telemetry.from_orm(row) for row in rows]
+        latencies.append(time.perf_counter() - started)
+        assert len(result) == limit
+
+    return summarize(latencies)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    await reset()
+    try:
+        async with database.sessions.begin() as session:
+            user = User(
+                username="benchmark",
+                password="benchmark",
+                password_update_date=datetime.utcnow(),
+                salt="",
+            )
+            session.add(user)
+            await session.flush()
+            ship = Ship(owner_id=user.id, imai=10000000, name="Reads", color="#000")
+            session.add(ship)
+            await session.flush()
+            user_id, ship_id = user.id, ship.id
+
+        print(f"loading {args.rows} rows", file=sys.stderr)
+        await load_history(ship_id, args.rows)
+
+        results: dict[str, Any] = {
+            "started_at": datetime.now(UTC).isoformat(),
+            "database": database.engine.url.render_as_string(hide_password=True),
+            "rows": args.rows,
+            "pages": [],
+        }
+        for limit in args.limits:
+            print(f"page {limit}", file=sys.stderr)
+            await measure(after, False, user_id, ship_id, limit, 3)
+            results["pages"].append(
+                {
+                    "limit": limit,
+                    "joined_entities": await measure(
+                        before, True, user_id, ship_id, limit, args.repeats
+                    ),
+                    "columns": await measure(
+                        after, False, user_id, ship_id, limit, args.repeats
+                    ),
+                }
+            )
+
+        return results
+    finally:
+        await database.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare telemetry history reads that hydrate joined ORM "
+        "entities with column-only reads. The BENCHMARK_DATABASE database is wiped."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
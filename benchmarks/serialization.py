@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+# isort: off
+import environment
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+from sqlalchemy.engine import FrozenResult
+
+import database
+import models
+from database.ship import Ship
+from database.telemetry import Telemetry
+from database.user import User
+from endpoints import responses
+from service import load_history, reset, summarize
+
+field = create_response_field("Response", list[models.telemetry.Telemetry])
+
+
+async def validated(frozen: FrozenResult[Any]) -> bytes:
+    content = [models.telemetry.Telemetry.from_orm(row) for row in frozen()]
+    return JSONResponse(
+        await serialize_response(field=field, response_content=content)
+    ).body
+
+
+async def direct(frozen: FrozenResult[Any]) -> bytes:
+    return responses.JSONResponse(responses.get_rows(frozen())).body
+
+
+async def measure(
+    encode: Callable[[FrozenResult[Any]], Awaitable[bytes]],
+    frozen: FrozenResult[Any],
+    repeats: int,
+) -> tuple[dict[str, float], bytes]:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = await encode(frozen)
+        latencies.append(time.perf_counter() - started)
+
+    return summarize(latencies), body
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    await reset()
+    try:
+        async with database.sessions.begin() as session:
+            user = User(
+                username="benchmark",
+                password="benchmark",
+                password_update_date=datetime.utcnow(),
+                salt="",
+            )
+            session.add(user)
+            await session.flush()
+            ship = Ship(owner_id=user.id, imai=10000000, name="Serial", color="#000")
+            session.add(ship)
+            await session.flush()
+            ship_id = ship.id
+
+        print(f"loading {args.rows} rows", file=sys.stderr)
+        await load_history(ship_id, args.rows)
+
+        results: dict[str, Any] = {
+            "started_at": datetime.now(UTC).isoformat(),
+            "database": database.engine.url.render_as_string(hide_password=True),
+            "rows": args.rows,
+            "pages": [],
+        }
+        for limit in args.limits:
+            print(f"page {limit}", file=sys.stderr)
+            statement = (
+                select(*database.telemetry.fields)
+                .where(Telemetry.ship_id == ship_id)
+                .order_by(Telemetry.datetime.desc(), Telemetry.id.desc())
+                .limit(limit)
+            )
+
+            latencies = []
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                async with database.sessions.begin() as session:
+                    frozen = (await session.execute(statement)).freeze()
+                latencies.append(time.perf_counter() - started)
+
+            before, expected = await measure(validated, frozen, args.repeats)
+            after, body = await measure(direct, frozen, args.repeats)
+            assert json.loads(body) == json.loads(expected)
+
+            results["pages"].append(
+                {
+                    "limit": limit,
+                    "query": summarize(latencies),
+                    "validated": before,
+                    "direct": after,
+                }
+            )
+
+        return results
+    finally:
+        await database.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare encoding telemetry pages through from_orm and "
+        "response model validation with encoding rows directly with orjson. "
+        "The BENCHMARK_DATABASE database is wiped."
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
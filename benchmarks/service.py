@@ -0,0 +1,430 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+import numpy as np
+import orjson
+
+# isort: off
+import environment
+from fastapi import FastAPI
+from sqlalchemy import text
+
+import database
+import endpoints
+import pubsub
+from database.telemetry import Telemetry
+from settings import settings
+
+start_time = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+async def request(
+    app: FastAPI,
+    method: str,
+    path: str,
+    query: dict[str, Any] | None = None,
+    headers: dict[str, str] | None = None,
+    body: Any = None,
+) -> tuple[int, Any]:
+    content = b"" if body is None else orjson.dumps(body)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": urlencode(query or {}).encode(),
+        "headers": [
+            (b"content-type", b"application/json"),
+            *[
+                (key.lower().encode(), value.encode())
+                for key, value in (headers or {}).items()
+            ],
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+    }
+    sent = False
+    status = 0
+    chunks = []
+
+    async def receive() -> dict[str, Any]:
+        nonlocal sent
+        if sent:
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": content, "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    data = b"".join(chunks)
+    return status, orjson.loads(data) if data else None
+
+
+class Listener:
+    def __init__(self, app: FastAPI, path: str, query: dict[str, Any]) -> None:
+        self.inbox: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.received: dict[int, float] = {}
+        self.task = asyncio.create_task(
+            app(
+                {
+                    "type": "websocket",
+                    "asgi": {"version": "3.0"},
+                    "path": path,
+                    "raw_path": path.encode(),
+                    "root_path": "",
+                    "query_string": urlencode(query).encode(),
+                    "headers": [],
+                    "scheme": "ws",
+                    "subprotocols": [],
+                    "client": ("127.0.0.1", 0),
+                    "server": ("127.0.0.1", 80),
+                },
+                self.inbox.get,
+                self.send,
+            )
+        )
+        self.inbox.put_nowait({"type": "websocket.connect"})
+
+    async def send(self, message: dict[str, Any]) -> None:
+        if message["type"] == "websocket.accept":
+            self.accepted.set()
+        elif message["type"] == "websocket.send":
+            self.received[orjson.loads(message["text"])["id"]] = time.perf_counter()
+
+    async def close(self) -> None:
+        self.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+def point(ship_id: int, index: int) -> dict[str, Any]:
+    return {
+        "ship_id": ship_id,
+        "datetime": (start_time + timedelta(seconds=index)).isoformat(),
+        "longitude": 30 + random.uniform(-1, 1),
+        "latitude": 60 + random.uniform(-1, 1),
+        "angle": random.uniform(0, 360),
+        "temperature": random.uniform(10, 30),
+        "voltage": random.uniform(11, 13),
+        "velocity": random.uniform(0, 10),
+    }
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    values = np.array(latencies) * 1e3
+    return {
+        "count": len(latencies),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+async def reset() -> None:
+    if settings.database == environment.application_database:
+        raise SystemExit("BENCHMARK_DATABASE must not be the application DATABASE")
+
+    async with database.engine.begin() as connection:
+        await connection.run_sync(database.Base.metadata.drop_all)
+        await connection.run_sync(database.Base.metadata.create_all)
+        await database.partition.maintain(connection)
+
+
+async def create_fleet(
+    app: FastAPI,
+    users: int,
+    ships: int,
+) -> list[tuple[dict[str, str], list[int]]]:
+    fleet = []
+    for user in range(users):
+        status, token = await request(
+            app,
+            "POST",
+            "/user/register",
+            body={"username": f"benchmark{user}", "password": "benchmark"},
+        )
+        assert status == 200, token
+        headers = {"X-Token": token["token"]}
+
+        ids = []
+        for ship in range(ships):
+            status, created = await request(
+                app,
+                "POST",
+                "/ship/add",
+                headers=headers,
+                body={
+                    "imai": 10000000 + user * ships + ship,
+                    "name": f"Benchmark {user}-{ship}",
+                    "color": "#000",
+                },
+            )
+            assert status == 200, created
+            ids.append(created["id"])
+
+        fleet.append((headers, ids))
+    return fleet
+
+
+async def ingestion(
+    app: FastAPI,
+    fleet: list[tuple[dict[str, str], list[int]]],
+    points: int,
+    concurrency: int,
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    counter = iter(range(points))
+
+    async def worker(headers: dict[str, str], ids: list[int]) -> None:
+        for index in counter:
+            started = time.perf_counter()
+            status, _ = await request(
+                app,
+                "POST",
+                "/telemetry/add",
+                headers=headers,
+                body=point(random.choice(ids), index),
+            )
+            latencies.append(time.perf_counter() - started)
+            assert status == 200
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *[worker(*fleet[index % len(fleet)]) for index in range(concurrency)]
+    )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "points": points,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "points_per_second": points / elapsed,
+        "latency": summarize(latencies),
+    }
+
+
+async def load_history(ship_id: int, rows: int) -> None:
+    until = start_time + timedelta(seconds=rows)
+    month = database.partition.get_month(start_time)
+    months = []
+    while month <= database.partition.get_month(until):
+        months.append(datetime(month.year, month.month, 1))
+        month = database.partition.add_months(month, 1)
+    await database.partition.ensure(months)
+
+    async with database.engine.begin() as connection:
+        await connection.execute(
+            text(
+                f"INSERT INTO {Telemetry.__tablename__} (ship_id, datetime, "
+                "longitude, latitude, angle, temperature, voltage, velocity) "
+                "SELECT :ship_id, CAST(:start AS timestamp) + make_interval(secs => g), "
+                "30 + random(), 60 + random(), random() * 360, "
+                "10 + random() * 20, 11 + random() * 2, random() * 10 "
+                "FROM generate_series(0, :rows - 1) AS g"
+            ),
+            {
+                "ship_id": ship_id,
+                "start": start_time.replace(tzinfo=None),
+                "rows": rows,
+            },
+        )
+        await connection.execute(text(f"ANALYZE {Telemetry.__tablename__}"))
+
+
+async def history(
+    app: FastAPI,
+    headers: dict[str, str],
+    ship_id: int,
+    rows: int,
+    repeats: int,
+    limit: int,
+) -> dict[str, Any]:
+    await load_history(ship_id, rows)
+
+    results = {}
+    window = timedelta(seconds=rows // 2)
+    queries = {
+        "latest_page": {"id": ship_id, "limit": limit},
+        "window_page": {
+            "id": ship_id,
+            "limit": limit,
+            "since": (start_time + window).isoformat(),
+            "until": (start_time + window + timedelta(hours=1)).isoformat(),
+        },
+    }
+
+    for name, query in queries.items():
+        latencies = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            status, body = await request(
+                app, "GET", "/ship/get/telemetry", query=query, headers=headers
+            )
+            latencies.append(time.perf_counter() - started)
+            assert status == 200 and len(body) == limit, status
+        results[name] = summarize(latencies)
+
+    return {"rows": rows, "limit": limit, **results}
+
+
+async def delivery(
+    app: FastAPI,
+    headers: dict[str, str],
+    ship_id: int,
+    subscribers: int,
+    events: int,
+) -> dict[str, Any]:
+    listeners = [
+        Listener(
+            app,
+            "/telemetry/listen",
+            {"id": ship_id, "token": headers["X-Token"]},
+        )
+        for _ in range(subscribers)
+    ]
+    await asyncio.gather(*[listener.accepted.wait() for listener in listeners])
+    await asyncio.sleep(0.1)
+
+    published: dict[int, float] = {}
+    for index in range(events):
+        started = time.perf_counter()
+        status, body = await request(
+            app,
+            "POST",
+            "/telemetry/add",
+            headers=headers,
+            body=point(ship_id, 10_000_000 + index),
+        )
+        assert status == 200
+        published[body["id"]] = started
+
+    deadline = time.perf_counter() + 10
+    while time.perf_counter() < deadline and any(
+        len(listener.received) < events for listener in listeners
+    ):
+        await asyncio.sleep(0.01)
+
+    latencies = [
+        listener.received[id] - started
+        for listener in listeners
+        for id, started in published.items()
+        if id in listener.received
+    ]
+    await asyncio.gather(*[listener.close() for listener in listeners])
+
+    return {
+        "subscribers": subscribers,
+        "events": events,
+        "missing": subscribers * events - len(latencies),
+        "latency": summarize(latencies),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    random.seed(args.seed)
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+
+    await reset()
+    await pubsub.backend.start()
+    try:
+        fleet = await create_fleet(app, args.users, args.ships)
+        results: dict[str, Any] = {
+            "started_at": datetime.now(UTC).isoformat(),
+            "database": database.engine.url.render_as_string(hide_password=True),
+            "pubsub": type(pubsub.backend).__name__,
+            "users": args.users,
+            "ships_per_user": args.ships,
+        }
+
+        print("ingestion", file=sys.stderr)
+        results["ingestion"] = await ingestion(
+            app, fleet, args.points, args.concurrency
+        )
+
+        results["history"] = []
+        for index, rows in enumerate(args.rows):
+            print(f"history {rows}", file=sys.stderr)
+            headers, ids = fleet[0]
+            status, ship = await request(
+                app,
+                "POST",
+                "/ship/add",
+                headers=headers,
+                body={
+                    "imai": 90000000 + index,
+                    "name": f"History {rows}",
+                    "color": "#000",
+                },
+            )
+            assert status == 200
+            results["history"].append(
+                await history(app, headers, ship["id"], rows, args.repeats, args.limit)
+            )
+
+        results["delivery"] = []
+        for subscribers in args.subscribers:
+            print(f"delivery {subscribers}", file=sys.stderr)
+            headers, ids = fleet[0]
+            results["delivery"].append(
+                await delivery(app, headers, ids[0], subscribers, args.events)
+            )
+
+        return results
+    finally:
+        await pubsub.backend.stop()
+        await database.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark ingestion, history reads and live delivery "
+        "in-process. The BENCHMARK_DATABASE database is wiped."
+    )
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--ships", type=int, default=10)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
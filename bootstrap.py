@@ -0,0 +1,25 @@
+import asyncio
+import logging
+
+# isort: off
+import models
+import database
+
+
+async def bootstrap() -> None:
+    try:
+        async with database.engine.begin() as connection:
+            await database.partition.lock(connection)
+            await connection.run_sync(database.Base.metadata.create_all)
+            await database.partition.migrate(connection)
+            await database.partition.maintain(connection)
+
+        await database.rollup.rebuild()
+        await database.state.rebuild()
+    finally:
+        await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(bootstrap())
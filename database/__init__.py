@@ -2,8 +2,23 @@ from settings import settings
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
-engine = create_async_engine(settings.database)
+from . import pool
+from . import commit
+
+engine = create_async_engine(
+    settings.database,
+    poolclass=pool.MeasuredPool,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_timeout=settings.database_pool_timeout,
+    pool_recycle=settings.database_pool_recycle,
+    pool_pre_ping=settings.database_pool_pre_ping,
+    connect_args={
+        "prepared_statement_cache_size": settings.database_statement_cache_size,
+    },
+)
 sessions = async_sessionmaker(engine)
+pool.observe(engine)
 
 
 class Base(DeclarativeBase):
@@ -13,3 +28,8 @@ class Base(DeclarativeBase):
 from . import user
 from . import ship
 from . import telemetry
+from . import rollup
+from . import state
+from . import ingest
+from . import course
+from . import partition
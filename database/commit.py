@@ -0,0 +1,26 @@
+import logging
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+key = "on_commit"
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    session.info.setdefault(key, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def run(session: Session) -> None:
+    for callback in session.info.pop(key, []):
+        try:
+            callback()
+        except Exception:
+            logging.exception("Commit callback failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def discard(session: Session) -> None:
+    session.info.pop(key, None)
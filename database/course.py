@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+from database.ship import Ship
+
+
+class CourseTracker(Base):
+    __tablename__ = "course_trackers"
+    ship_id: Mapped[int] = mapped_column(
+        ForeignKey(Ship.id, ondelete="CASCADE"),
+        primary_key=True,
+    )
+    datetime: Mapped[datetime | None]
+    deviated: Mapped[bool] = mapped_column(default=False)
+    arrived: Mapped[bool] = mapped_column(default=False)
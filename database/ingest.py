@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+from database.ship import Ship
+
+
+class IngestCursor(Base):
+    __tablename__ = "ingest_cursors"
+    ship_id: Mapped[int] = mapped_column(
+        ForeignKey(Ship.id, ondelete="CASCADE"),
+        primary_key=True,
+    )
+    sequence: Mapped[int] = mapped_column(BigInteger)
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Iterable
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateColumn
+
+import database
+from database.telemetry import Telemetry
+from settings import settings
+
+lock_id = 0x706172746974
+months_ahead = 2
+maintenance_interval = 3600.0
+months: set[date] = set()
+
+
+def get_month(value: datetime | date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_name(month: date) -> str:
+    return f"{Telemetry.__tablename__}_{month:%Y_%m}"
+
+
+async def lock(connection: AsyncConnection) -> None:
+    await connection.execute(select(func.pg_advisory_xact_lock(lock_id)))
+
+
+async def load(connection: AsyncConnection) -> None:
+    names = await connection.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": Telemetry.__tablename__},
+    )
+
+    months.clear()
+    for name in names:
+        year, month = name.removeprefix(f"{Telemetry.__tablename__}_").split("_")
+        months.add(date(int(year), int(month), 1))
+
+
+async def create(connection: AsyncConnection, month: date) -> None:
+    if month in months:
+        return
+
+    await connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {get_name(month)} "
+            f"PARTITION OF {Telemetry.__tablename__} "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+        )
+    )
+    months.add(month)
+
+
+def get_range() -> tuple[date, date]:
+    current = get_month(datetime.utcnow())
+    history = settings.telemetry_backfill_months
+    if settings.telemetry_retention_months is not None:
+        history = min(history, settings.telemetry_retention_months)
+
+    return add_months(current, -history), add_months(current, months_ahead + 1)
+
+
+async def ensure(values: Iterable[datetime]) -> None:
+    requested = {get_month(value) for value in values}
+    start, end = get_range()
+    if any(month < start or month >= end for month in requested):
+        raise ValueError("Telemetry datetime is out of range")
+
+    missing = requested - months
+    if len(missing) == 0:
+        return
+
+    async with database.engine.begin() as connection:
+        await lock(connection)
+        for month in sorted(missing):
+            await create(connection, month)
+
+
+async def drop_expired(connection: AsyncConnection) -> None:
+    if settings.telemetry_retention_months is None:
+        return
+
+    oldest = add_months(
+        get_month(datetime.utcnow()), -settings.telemetry_retention_months
+    )
+    for month in sorted(months):
+        if month >= oldest:
+            break
+
+        logging.info("Dropping expired telemetry partition %s", get_name(month))
+        await connection.execute(
+            text(
+                f"ALTER TABLE {Telemetry.__tablename__} "
+                f"DETACH PARTITION {get_name(month)}"
+            )
+        )
+        await connection.execute(text(f"DROP TABLE {get_name(month)}"))
+        months.discard(month)
+
+
+async def maintain(connection: AsyncConnection) -> None:
+    await lock(connection)
+    await load(connection)
+
+    current = get_month(datetime.utcnow())
+    for index in range(months_ahead + 1):
+        await create(connection, add_months(current, index))
+
+    await drop_expired(connection)
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    table = Telemetry.__table__
+    existing = set(
+        await connection.scalars(
+            text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = :table"
+            ),
+            {"table": table.name},
+        )
+    )
+
+    for column in table.columns:
+        if column.name in existing:
+            continue
+
+        logging.info("Adding column %s to %s", column.name, table.name)
+        definition = CreateColumn(column).compile(dialect=connection.dialect)
+        await connection.execute(
+            text(f"ALTER TABLE {table.name} ADD COLUMN {definition}")
+        )
+
+    for index in table.indexes:
+        await connection.run_sync(index.create, checkfirst=True)
+
+
+async def migrate(connection: AsyncConnection) -> None:
+    await lock(connection)
+
+    partitioned = await connection.scalar(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid "
+            "WHERE pg_class.relname = :table)"
+        ),
+        {"table": Telemetry.__tablename__},
+    )
+    if partitioned:
+        await upgrade(connection)
+        return
+
+    table = Telemetry.__tablename__
+    legacy = f"{table}_legacy"
+    logging.info("Moving %s into a partitioned table", table)
+
+    sequence = await connection.scalar(select(func.pg_get_serial_sequence(table, "id")))
+    indexes = await connection.scalars(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+        {"table": table},
+    )
+
+    await connection.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    for index in list(indexes):
+        await connection.execute(text(f"ALTER INDEX {index} RENAME TO {index}_legacy"))
+    if sequence is not None:
+        await connection.execute(
+            text(f"ALTER SEQUENCE {sequence} RENAME TO {legacy}_id_seq")
+        )
+
+    await connection.run_sync(Telemetry.__table__.create)
+    months.clear()
+
+    bounds = (
+        await connection.execute(
+            text(f"SELECT min(datetime), max(datetime), max(id) FROM {legacy}")
+        )
+    ).one()
+    if bounds[0] is not None:
+        month = get_month(bounds[0])
+        while month <= get_month(bounds[1]):
+            await create(connection, month)
+            month = add_months(month, 1)
+
+        columns = ", ".join(
+            column.name
+            for column in Telemetry.__table__.columns
+            if column.computed is None
+        )
+        await connection.execute(
+            text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}")
+        )
+        await connection.execute(
+            select(func.setval(func.pg_get_serial_sequence(table, "id"), bounds[2]))
+        )
+
+    await connection.execute(text(f"DROP TABLE {legacy}"))
+
+
+async def run() -> None:
+    while True:
+        await asyncio.sleep(maintenance_interval)
+
+        try:
+            async with database.engine.begin() as connection:
+                await maintain(connection)
+        except Exception:
+            logging.exception("Telemetry partition maintenance failed")
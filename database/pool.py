@@ -0,0 +1,86 @@
+import time
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+checkout_seconds = Histogram(
+    "brainyboat_database_pool_checkout_seconds",
+    "Time spent waiting for a database connection",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+checkout_timeouts = Counter(
+    "brainyboat_database_pool_checkout_timeouts",
+    "Database connection checkouts that timed out",
+)
+connections_in_use = Gauge(
+    "brainyboat_database_pool_in_use",
+    "Database connections checked out of the pool",
+)
+connections_idle = Gauge(
+    "brainyboat_database_pool_idle",
+    "Database connections idle in the pool",
+)
+connections_overflow = Gauge(
+    "brainyboat_database_pool_overflow",
+    "Database connections opened above the pool size",
+)
+query_seconds = Histogram(
+    "brainyboat_database_query_seconds",
+    "Time spent executing database statements",
+    ["statement"],
+    buckets=(
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        10,
+    ),
+)
+statements = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class MeasuredPool(AsyncAdaptedQueuePool):
+    def connect(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except TimeoutError:
+            checkout_timeouts.inc()
+            raise
+        finally:
+            checkout_seconds.observe(time.perf_counter() - start)
+
+
+def before_execute(connection: Any, *args: Any) -> None:
+    connection.info["query_start"] = time.perf_counter()
+
+
+def after_execute(
+    connection: Any,
+    cursor: Any,
+    statement: str,
+    *args: Any,
+) -> None:
+    elapsed = time.perf_counter() - connection.info["query_start"]
+    keyword = statement[:16].split(maxsplit=1)[0].upper()
+    query_seconds.labels(keyword if keyword in statements else "OTHER").observe(elapsed)
+
+
+def observe(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_execute)
+    connections_in_use.set_function(lambda: engine.pool.checkedout())
+    connections_idle.set_function(lambda: engine.pool.checkedin())
+    connections_overflow.set_function(lambda: max(engine.pool.overflow(), 0))
@@ -0,0 +1,317 @@
+import logging
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import (
+    Alias,
+    ColumnElement,
+    ForeignKey,
+    FromClause,
+    Integer,
+    Lateral,
+    String,
+    Values,
+    all_,
+    and_,
+    any_,
+    bindparam,
+    column,
+    func,
+    select,
+    true,
+    tuple_,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+import database
+from database import Base
+from database.ship import Ship
+from database.telemetry import Telemetry
+
+resolutions = ("minute", "hour", "day")
+earth_radius = 6371008.8
+lock_id = 0x726F6C6C7570
+ship_lock_id = 0x726F6C6C
+
+
+class TelemetryRollup(Base):
+    __tablename__ = "telemetry_rollups"
+    ship_id: Mapped[int] = mapped_column(
+        ForeignKey(Ship.id, ondelete="CASCADE"),
+        primary_key=True,
+    )
+    resolution: Mapped[str] = mapped_column(String(6), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(primary_key=True)
+    count: Mapped[int]
+    distance: Mapped[float]
+    temperature_min: Mapped[float]
+    temperature_max: Mapped[float]
+    temperature_sum: Mapped[float]
+    voltage_min: Mapped[float]
+    voltage_max: Mapped[float]
+    voltage_sum: Mapped[float]
+    velocity_min: Mapped[float]
+    velocity_max: Mapped[float]
+    velocity_sum: Mapped[float]
+
+
+def haversine(
+    longitude1: Any,
+    latitude1: Any,
+    longitude2: Any,
+    latitude2: Any,
+) -> ColumnElement[float]:
+    return (
+        2
+        * earth_radius
+        * func.asin(
+            func.least(
+                1,
+                func.sqrt(
+                    func.power(func.sin(func.radians(latitude2 - latitude1) / 2), 2)
+                    + func.cos(func.radians(latitude1))
+                    * func.cos(func.radians(latitude2))
+                    * func.power(func.sin(func.radians(longitude2 - longitude1) / 2), 2)
+                ),
+            )
+        )
+    )
+
+
+def get_previous(
+    current: FromClause,
+    *conditions: ColumnElement[bool],
+) -> Lateral:
+    return (
+        select(Telemetry.longitude, Telemetry.latitude)
+        .where(
+            and_(
+                Telemetry.ship_id == current.c.ship_id,
+                tuple_(Telemetry.datetime, Telemetry.id)
+                < tuple_(current.c.datetime, current.c.id),
+                *conditions,
+            )
+        )
+        .order_by(Telemetry.datetime.desc(), Telemetry.id.desc())
+        .limit(1)
+        .lateral()
+    )
+
+
+def get_distance(previous: Lateral, current: FromClause) -> ColumnElement[float]:
+    return func.coalesce(
+        haversine(
+            previous.c.longitude,
+            previous.c.latitude,
+            current.c.longitude,
+            current.c.latitude,
+        ),
+        0,
+    )
+
+
+def get_resolutions() -> Values:
+    return values(column("resolution", String), name="resolutions").data(
+        [(resolution,) for resolution in resolutions]
+    )
+
+
+async def upsert(
+    session: AsyncSession,
+    condition: Callable[[Alias], ColumnElement[bool]],
+) -> None:
+    current = Telemetry.__table__.alias("current")
+    previous = get_previous(current)
+    points = (
+        select(current, get_distance(previous, current).label("distance"))
+        .select_from(current.outerjoin(previous, true()))
+        .where(condition(current))
+        .subquery("points")
+    )
+    resolution = get_resolutions()
+    bucket = func.date_trunc(resolution.c.resolution, points.c.datetime)
+
+    rows = (
+        select(
+            points.c.ship_id,
+            resolution.c.resolution,
+            bucket,
+            func.count(),
+            func.sum(points.c.distance),
+            *[
+                aggregate(points.c[name])
+                for name in ("temperature", "voltage", "velocity")
+                for aggregate in (func.min, func.max, func.sum)
+            ],
+        )
+        .select_from(points.join(resolution, true()))
+        .group_by(points.c.ship_id, resolution.c.resolution, bucket)
+        .order_by(points.c.ship_id, resolution.c.resolution, bucket)
+    )
+
+    statement = insert(TelemetryRollup).from_select(
+        [
+            "ship_id",
+            "resolution",
+            "bucket",
+            "count",
+            "distance",
+            "temperature_min",
+            "temperature_max",
+            "temperature_sum",
+            "voltage_min",
+            "voltage_max",
+            "voltage_sum",
+            "velocity_min",
+            "velocity_max",
+            "velocity_sum",
+        ],
+        rows,
+    )
+    table = TelemetryRollup.__table__.c
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["ship_id", "resolution", "bucket"],
+            set_={
+                "count": table.count + statement.excluded.count,
+                "distance": table.distance + statement.excluded.distance,
+                **{
+                    f"{name}_min": func.least(
+                        table[f"{name}_min"], statement.excluded[f"{name}_min"]
+                    )
+                    for name in ("temperature", "voltage", "velocity")
+                },
+                **{
+                    f"{name}_max": func.greatest(
+                        table[f"{name}_max"], statement.excluded[f"{name}_max"]
+                    )
+                    for name in ("temperature", "voltage", "velocity")
+                },
+                **{
+                    f"{name}_sum": table[f"{name}_sum"]
+                    + statement.excluded[f"{name}_sum"]
+                    for name in ("temperature", "voltage", "velocity")
+                },
+            },
+        )
+    )
+
+
+async def correct(session: AsyncSession, ids: list[int]) -> None:
+    parameter = bindparam("ids", ids, ARRAY(Integer))
+    inserted = Telemetry.__table__.alias("inserted")
+    following = (
+        select(
+            Telemetry.id,
+            Telemetry.ship_id,
+            Telemetry.datetime,
+            Telemetry.longitude,
+            Telemetry.latitude,
+        )
+        .where(
+            and_(
+                Telemetry.ship_id == inserted.c.ship_id,
+                tuple_(Telemetry.datetime, Telemetry.id)
+                > tuple_(inserted.c.datetime, inserted.c.id),
+            )
+        )
+        .order_by(Telemetry.datetime, Telemetry.id)
+        .limit(1)
+        .lateral("following")
+    )
+    successors = (
+        select(following)
+        .distinct()
+        .select_from(inserted.join(following, true()))
+        .where(
+            and_(
+                inserted.c.id == any_(parameter),
+                following.c.id != all_(parameter),
+            )
+        )
+        .subquery("successors")
+    )
+
+    previous = get_previous(successors)
+    stale = get_previous(successors, Telemetry.id != all_(parameter))
+    resolution = get_resolutions()
+    bucket = func.date_trunc(resolution.c.resolution, successors.c.datetime)
+    corrections = (
+        select(
+            successors.c.ship_id,
+            resolution.c.resolution,
+            bucket.label("bucket"),
+            func.sum(
+                get_distance(previous, successors) - get_distance(stale, successors)
+            ).label("distance"),
+        )
+        .select_from(
+            successors.outerjoin(previous, true())
+            .outerjoin(stale, true())
+            .join(resolution, true())
+        )
+        .group_by(successors.c.ship_id, resolution.c.resolution, bucket)
+        .subquery("corrections")
+    )
+
+    table = TelemetryRollup.__table__
+    await session.execute(
+        table.update()
+        .where(
+            and_(
+                table.c.ship_id == corrections.c.ship_id,
+                table.c.resolution == corrections.c.resolution,
+                table.c.bucket == corrections.c.bucket,
+            )
+        )
+        .values(distance=table.c.distance + corrections.c.distance)
+    )
+
+
+async def lock(session: AsyncSession, ids: list[int]) -> None:
+    ship_ids = await session.scalars(
+        select(Telemetry.ship_id)
+        .distinct()
+        .where(Telemetry.id == any_(bindparam("ids", ids, ARRAY(Integer))))
+        .order_by(Telemetry.ship_id)
+    )
+
+    for ship_id in ship_ids.all():
+        await session.execute(select(func.pg_advisory_xact_lock(ship_lock_id, ship_id)))
+
+
+async def update(session: AsyncSession, ids: list[int]) -> None:
+    await lock(session, ids)
+    await upsert(
+        session,
+        lambda current: current.c.id == any_(bindparam("ids", ids, ARRAY(Integer))),
+    )
+    await correct(session, ids)
+
+
+async def rebuild(chunk_size: int = 100000) -> None:
+    async with database.sessions.begin() as session:
+        await session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"}
+        )
+        await session.execute(select(func.pg_advisory_xact_lock(lock_id)))
+
+        if await session.scalar(select(TelemetryRollup.ship_id).limit(1)) is not None:
+            return
+
+        last_id = await session.scalar(select(func.max(Telemetry.id)))
+        if last_id is None:
+            return
+
+        logging.info("Rebuilding telemetry rollups up to id %s", last_id)
+        for start in range(0, last_id, chunk_size):
+            await upsert(
+                session,
+                lambda current: and_(
+                    current.c.id > start,
+                    current.c.id <= start + chunk_size,
+                ),
+            )
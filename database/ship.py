@@ -19,4 +19,4 @@ class Ship(Base):
     name: Mapped[str]
     color: Mapped[str]
 
-    owner: Mapped[User] = relationship(lazy="joined")
+    owner: Mapped[User] = relationship(lazy="raise")
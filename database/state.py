@@ -0,0 +1,110 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import (
+    ColumnElement,
+    ForeignKey,
+    Integer,
+    any_,
+    bindparam,
+    func,
+    select,
+    true,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+import database
+from database import Base
+from database.ship import Ship
+from database.telemetry import Telemetry
+
+lock_id = 0x7374617465
+columns = (
+    "datetime",
+    "longitude",
+    "latitude",
+    "angle",
+    "temperature",
+    "voltage",
+    "velocity",
+)
+
+
+class ShipState(Base):
+    __tablename__ = "ship_states"
+    ship_id: Mapped[int] = mapped_column(
+        ForeignKey(Ship.id, ondelete="CASCADE"),
+        primary_key=True,
+    )
+    telemetry_id: Mapped[int]
+    datetime: Mapped[datetime]
+    longitude: Mapped[float]
+    latitude: Mapped[float]
+    angle: Mapped[float]
+    temperature: Mapped[float]
+    voltage: Mapped[float]
+    velocity: Mapped[float]
+
+
+async def upsert(session: AsyncSession, condition: ColumnElement[bool]) -> None:
+    rows = (
+        select(
+            Telemetry.ship_id,
+            Telemetry.id,
+            *[Telemetry.__table__.c[name] for name in columns],
+        )
+        .distinct(Telemetry.ship_id)
+        .where(condition)
+        .order_by(Telemetry.ship_id, Telemetry.datetime.desc(), Telemetry.id.desc())
+    )
+
+    statement = insert(ShipState).from_select(
+        ["ship_id", "telemetry_id", *columns],
+        rows,
+    )
+    table = ShipState.__table__.c
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["ship_id"],
+            set_={
+                "telemetry_id": statement.excluded.telemetry_id,
+                **{name: statement.excluded[name] for name in columns},
+            },
+            where=tuple_(statement.excluded.datetime, statement.excluded.telemetry_id)
+            > tuple_(table.datetime, table.telemetry_id),
+        )
+    )
+
+
+async def update(session: AsyncSession, ids: list[int]) -> None:
+    await upsert(session, Telemetry.id == any_(bindparam("ids", ids, ARRAY(Integer))))
+
+
+async def rebuild() -> None:
+    async with database.sessions.begin() as session:
+        await session.execute(select(func.pg_advisory_xact_lock(lock_id)))
+
+        if await session.scalar(select(ShipState.ship_id).limit(1)) is not None:
+            return
+
+        logging.info("Rebuilding ship states")
+        latest = (
+            select(
+                Telemetry.ship_id,
+                Telemetry.id,
+                *[Telemetry.__table__.c[name] for name in columns],
+            )
+            .where(Telemetry.ship_id == Ship.id)
+            .order_by(Telemetry.datetime.desc(), Telemetry.id.desc())
+            .limit(1)
+            .lateral("latest")
+        )
+        await session.execute(
+            insert(ShipState).from_select(
+                ["ship_id", "telemetry_id", *columns],
+                select(latest).select_from(Ship).join(latest, true()),
+            )
+        )
@@ -1,15 +1,54 @@
 from datetime import datetime
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import (
+    BigInteger,
+    Computed,
+    ForeignKey,
+    Index,
+    PrimaryKeyConstraint,
+    func,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from analytics import cell
 from database import Base
 from database.ship import Ship
 
 
+def quantize(column: str, low: int, high: int) -> str:
+    return (
+        f"least(greatest(floor(({column} - ({low})) / {high - low}.0 "
+        f"* {1 << cell.bits}), 0), {(1 << cell.bits) - 1})::bigint"
+    )
+
+
+def spread(value: str) -> str:
+    for shift, mask in cell.masks:
+        value = f"(({value}) | (({value}) << {shift})) & {mask}"
+    return value
+
+
+def get_cell() -> str:
+    return (
+        f"({spread(quantize('longitude', -180, 180))}) "
+        f"| (({spread(quantize('latitude', -90, 90))}) << 1)"
+    )
+
+
 class Telemetry(Base):
     __tablename__ = "telemetry"
-    id: Mapped[int] = mapped_column(primary_key=True)
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "datetime"),
+        Index("ix_telemetry_ship_id_datetime", "ship_id", "datetime", "id"),
+        Index("ix_telemetry_ship_id_id", "ship_id", "id"),
+        Index("ix_telemetry_cell_datetime", "cell", "datetime"),
+        {"postgresql_partition_by": "RANGE (datetime)"},
+    )
+    __mapper_args__ = {"primary_key": ["id"]}
+
+    id: Mapped[int] = mapped_column(autoincrement=True)
     ship_id: Mapped[int] = mapped_column(ForeignKey(Ship.id, ondelete="CASCADE"))
     datetime: Mapped[datetime]
     longitude: Mapped[float]
@@ -18,5 +57,29 @@ class Telemetry(Base):
     temperature: Mapped[float]
     voltage: Mapped[float]
     velocity: Mapped[float]
+    cell: Mapped[int] = mapped_column(BigInteger, Computed(get_cell(), persisted=True))
+
+    ship: Mapped[Ship] = relationship(lazy="raise")
+
+
+fields = (
+    Telemetry.id,
+    Telemetry.ship_id,
+    Telemetry.datetime,
+    Telemetry.longitude,
+    Telemetry.latitude,
+    Telemetry.angle,
+    Telemetry.temperature,
+    Telemetry.voltage,
+    Telemetry.velocity,
+)
+
 
-    ship: Mapped[Ship] = relationship(lazy="joined")
+async def reserve(session: AsyncSession, count: int) -> list[int]:
+    return list(
+        await session.scalars(
+            select(
+                func.nextval(func.pg_get_serial_sequence(Telemetry.__tablename__, "id"))
+            ).select_from(func.generate_series(1, count))
+        )
+    )
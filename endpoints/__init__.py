@@ -1,12 +1,21 @@
 from fastapi import APIRouter
 
 from . import dependencies
+from . import responses
 
 from . import user
 from . import ship
 from . import telemetry
+from . import ingest
+from . import bulk
+from . import fleet
+from . import metrics
 
-router = APIRouter()
+router = APIRouter(default_response_class=responses.JSONResponse)
 router.include_router(user.router)
 router.include_router(ship.router)
 router.include_router(telemetry.router)
+router.include_router(ingest.router)
+router.include_router(bulk.router)
+router.include_router(fleet.router)
+router.include_router(metrics.router)
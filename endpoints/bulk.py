@@ -0,0 +1,182 @@
+import io
+import tempfile
+from typing import IO, Any, Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import and_, select
+
+import database
+import models
+from database.ship import Ship
+from database.telemetry import Telemetry
+from endpoints import dependencies, metrics, trips
+from settings import settings
+
+router = APIRouter(prefix="/telemetry", tags=["Telemetry"])
+
+schema = pa.schema(
+    [
+        pa.field("ship_id", pa.int32(), nullable=False),
+        pa.field("datetime", pa.timestamp("us"), nullable=False),
+        *[
+            pa.field(name, pa.float64(), nullable=False)
+            for name in (
+                "longitude",
+                "latitude",
+                "angle",
+                "temperature",
+                "voltage",
+                "velocity",
+            )
+        ],
+    ]
+)
+
+
+async def spool(request: Request) -> IO[bytes]:
+    file = tempfile.SpooledTemporaryFile(settings.import_spool_size)
+    async for chunk in request.stream():
+        file.write(chunk)
+
+    file.seek(0)
+    return file
+
+
+def read(
+    file: IO[bytes],
+    format: models.telemetry.ImportFormat,
+) -> Iterator[pa.RecordBatch]:
+    file.seek(0)
+
+    if format == models.telemetry.ImportFormat.parquet:
+        yield from pq.ParquetFile(file).iter_batches(
+            batch_size=settings.columnar_batch_size,
+            columns=schema.names,
+        )
+    elif format == models.telemetry.ImportFormat.arrow:
+        for batch in pa.ipc.open_stream(file):
+            yield batch.select(schema.names)
+    else:
+        yield from pa_csv.open_csv(
+            file,
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=schema.names,
+                column_types={
+                    field.name: field.type
+                    for field in schema
+                    if field.name != "datetime"
+                },
+            ),
+        )
+
+
+def convert(array: pa.Array, field: pa.Field) -> pa.Array:
+    if pa.types.is_timestamp(array.type) and array.type.tz is not None:
+        array = array.cast(pa.timestamp("us", tz="UTC"))
+
+    return array.cast(field.type)
+
+
+def normalize(batch: pa.RecordBatch) -> pa.RecordBatch:
+    arrays = [convert(batch.column(field.name), field) for field in schema]
+
+    if any(array.null_count != 0 for array in arrays) or not all(
+        pc.all(pc.is_finite(array)).as_py()
+        for array, field in zip(arrays, schema)
+        if pa.types.is_floating(field.type)
+    ):
+        raise HTTPException(422, "Invalid telemetry values")
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def scan(
+    file: IO[bytes],
+    format: models.telemetry.ImportFormat,
+) -> Iterator[pa.RecordBatch]:
+    try:
+        for batch in read(file, format):
+            if batch.num_rows != 0:
+                yield normalize(batch)
+    except (KeyError, pa.ArrowException) as error:
+        raise HTTPException(422, "Invalid telemetry file") from error
+
+
+def encode(batch: pa.RecordBatch, ids: list[int]) -> io.BytesIO:
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(
+        pa.RecordBatch.from_arrays(
+            [pa.array(ids, type=pa.int32()), *batch.columns],
+            names=["id", *schema.names],
+        ),
+        sink,
+        pa_csv.WriteOptions(include_header=False),
+    )
+    return io.BytesIO(sink.getvalue().to_pybytes())
+
+
+@router.post("/import")
+async def import_telemetry(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    request: Request,
+    format: models.telemetry.ImportFormat = models.telemetry.ImportFormat.csv,
+) -> models.telemetry.TelemetryCount:
+    with await spool(request) as file:
+        ship_ids: set[int] = set()
+        months: set[Any] = set()
+        for batch in scan(file, format):
+            ship_ids.update(pc.unique(batch.column("ship_id")).to_pylist())
+            months.update(
+                np.unique(
+                    batch.column("datetime")
+                    .to_numpy()
+                    .astype("datetime64[M]")
+                    .astype("datetime64[us]")
+                ).tolist()
+            )
+
+        if len(ship_ids) == 0:
+            return models.telemetry.TelemetryCount(count=0)
+
+        await dependencies.ensure_partitions(months)
+
+        count = 0
+        async with dependencies.transaction(session):
+            owned_ship_ids = set(
+                await session.scalars(
+                    select(Ship.id).where(
+                        and_(
+                            Ship.id.in_(ship_ids),
+                            Ship.owner_id == user.id,
+                        )
+                    )
+                )
+            )
+            if owned_ship_ids != ship_ids:
+                raise HTTPException(404, "Ship not found")
+
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+
+            for batch in scan(file, format):
+                ids = await database.telemetry.reserve(session, batch.num_rows)
+                await raw_connection.driver_connection.copy_to_table(
+                    Telemetry.__tablename__,
+                    source=encode(batch, ids),
+                    columns=["id", *schema.names],
+                    format="csv",
+                )
+                await database.rollup.update(session, ids)
+                await database.state.update(session, ids)
+                count += len(ids)
+
+            await trips.forget(session, ship_ids)
+
+        metrics.telemetry_ingested.inc(count)
+        return models.telemetry.TelemetryCount(count=count)
@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Iterator, TypeVar
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        ttl: float,
+        sliding: bool = False,
+    ) -> None:
+        self.name = name
+        self.size = size
+        self.ttl = ttl
+        self.sliding = sliding
+        self.items: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        caches[name] = self
+
+    def get(self, key: K) -> V | None:
+        item = self.items.get(key)
+
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self.items[key]
+
+            self.misses += 1
+            return None
+
+        if self.sliding:
+            self.items[key] = (time.monotonic() + self.ttl, item[1])
+
+        self.items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: K, value: V) -> None:
+        if self.size <= 0:
+            return
+
+        self.items[key] = (time.monotonic() + self.ttl, value)
+        self.items.move_to_end(key)
+
+        while len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def remove(self, predicate: Callable[[K], bool]) -> None:
+        for key in [key for key in self.items if predicate(key)]:
+            del self.items[key]
+
+
+class CacheCollector(Collector):
+    def collect(self) -> Iterator[GaugeMetricFamily | CounterMetricFamily]:
+        items = GaugeMetricFamily(
+            "brainyboat_cache_items",
+            "Entries held per cache",
+            labels=["cache"],
+        )
+        hits = CounterMetricFamily(
+            "brainyboat_cache_hits",
+            "Cache lookups that found a live entry",
+            labels=["cache"],
+        )
+        misses = CounterMetricFamily(
+            "brainyboat_cache_misses",
+            "Cache lookups that found nothing or an expired entry",
+            labels=["cache"],
+        )
+
+        for name, cache in caches.items():
+            items.add_metric([name], len(cache.items))
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+
+        yield from (items, hits, misses)
+
+
+caches: dict[str, TTLCache[Any, Any]] = {}
+REGISTRY.register(CacheCollector())
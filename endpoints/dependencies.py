@@ -1,15 +1,66 @@
-from typing import Annotated
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from typing import Annotated, Any, AsyncIterator, Iterable
 
 import jwt
-from fastapi import Depends, Header, HTTPException
-from sqlalchemy import select
+from fastapi import Depends, Header, HTTPException, Query, Response
+from sqlalchemy import Select, inspect, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 import database
+import models
+import pubsub
+from database.telemetry import Telemetry
 from database.user import User as DatabaseUser
+from endpoints import cache
 from settings import settings
 
+user_cache: cache.TTLCache[tuple[int, float], dict[str, Any]] = cache.TTLCache(
+    "user",
+    settings.user_cache_size,
+    settings.user_cache_ttl,
+)
 
-async def get_user(token: str) -> DatabaseUser:
+
+def receive(user_id: int, data: str) -> None:
+    user_cache.remove(lambda key: key[0] == user_id)
+
+
+user_pool = pubsub.Pool("user", 1, "latest", watch=receive)
+
+
+async def forget_user(session: AsyncSession, user_id: int) -> None:
+    await user_pool.publish(user_id, "null", session)
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    async with database.sessions() as session:
+        yield session
+
+
+Session = Annotated[AsyncSession, Depends(get_session)]
+
+
+@asynccontextmanager
+async def transaction(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    try:
+        yield session
+    except BaseException:
+        await session.rollback()
+        raise
+
+    await session.commit()
+
+
+async def ensure_partitions(values: Iterable[datetime]) -> None:
+    try:
+        await database.partition.ensure(values)
+    except ValueError:
+        raise HTTPException(422, "Telemetry datetime is out of range")
+
+
+async def get_user(session: AsyncSession, token: str) -> DatabaseUser:
     try:
         data: dict = jwt.decode(token, settings.secret, algorithms=["HS256"])
         user_id = int(data["sub"])
@@ -17,25 +68,114 @@ async def get_user(token: str) -> DatabaseUser:
     except (jwt.DecodeError, ValueError):
         raise HTTPException(401, "The token is invalid")
 
-    async with database.sessions.begin() as session:
-        user = await session.scalar(
-            select(DatabaseUser).where(DatabaseUser.id == user_id)
-        )
+    values = user_cache.get((user_id, issued_at))
+    if values is not None:
+        user = DatabaseUser(**values)
+        make_transient_to_detached(user)
+        return user
 
-        if user is None or user.password_update_date.timestamp() != issued_at:
-            raise HTTPException(401, "The token is invalid")
+    user = await session.scalar(select(DatabaseUser).where(DatabaseUser.id == user_id))
 
-        session.expunge(user)
-        return user
+    if user is None or user.password_update_date.timestamp() != issued_at:
+        raise HTTPException(401, "The token is invalid")
+
+    session.expunge(user)
 
+    user_cache.set(
+        (user_id, issued_at),
+        {
+            attribute.key: getattr(user, attribute.key)
+            for attribute in inspect(DatabaseUser).column_attrs
+        },
+    )
+    return user
 
-async def header_user(token: Annotated[str, Header(alias="X-Token")]) -> DatabaseUser:
-    return await get_user(token)
+
+async def header_user(
+    token: Annotated[str, Header(alias="X-Token")],
+    session: Session,
+) -> DatabaseUser:
+    async with transaction(session):
+        return await get_user(session, token)
 
 
 async def query_user(token: str) -> DatabaseUser:
-    return await header_user(token)
+    async with database.sessions() as session:
+        return await get_user(session, token)
+
+
+class TelemetryHistory:
+    def __init__(
+        self,
+        desc: bool = True,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: Annotated[int | None, Query(gt=0)] = None,
+        cursor: str | None = None,
+    ) -> None:
+        self.desc = desc
+        self.since = (
+            None if since is None else since.astimezone(UTC).replace(tzinfo=None)
+        )
+        self.until = (
+            None if until is None else until.astimezone(UTC).replace(tzinfo=None)
+        )
+        self.limit = limit
+
+        try:
+            self.cursor = (
+                None if cursor is None else models.telemetry.Cursor.decode(cursor)
+            )
+        except ValueError:
+            raise HTTPException(422, "The cursor is invalid")
+
+    def filter(
+        self,
+        statement: Select[Any],
+        column: Any = Telemetry.datetime,
+    ) -> Select[Any]:
+        if self.since is not None:
+            statement = statement.where(column >= self.since)
+
+        if self.until is not None:
+            statement = statement.where(column < self.until)
+
+        return statement
+
+    def apply(self, statement: Select[Any]) -> Select[Any]:
+        statement = self.filter(statement)
+
+        if self.cursor is not None:
+            key = tuple_(Telemetry.datetime, Telemetry.id)
+            value = tuple_(self.cursor.datetime, self.cursor.id)
+            statement = statement.where(key < value if self.desc else key > value)
+
+        if self.desc:
+            statement = statement.order_by(
+                Telemetry.datetime.desc(), Telemetry.id.desc()
+            )
+        else:
+            statement = statement.order_by(Telemetry.datetime, Telemetry.id)
+
+        if self.limit is not None:
+            statement = statement.limit(self.limit)
+
+        return statement
+
+    def set_cursor(
+        self,
+        response: Response,
+        telemetry: list[dict[str, Any]],
+    ) -> None:
+        if self.limit is None or len(telemetry) < self.limit:
+            return
+
+        response.headers["X-Cursor"] = models.telemetry.Cursor(
+            datetime=telemetry[-1]["datetime"],
+            id=telemetry[-1]["id"],
+        ).encode()
 
 
 HeaderUser = Annotated[DatabaseUser, Depends(header_user, use_cache=True)]
 QueryUser = Annotated[DatabaseUser, Depends(query_user, use_cache=True)]
+History = Annotated[TelemetryHistory, Depends()]
@@ -0,0 +1,152 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import analytics
+import models
+import pubsub
+from database.course import CourseTracker
+from database.ship import Ship
+from endpoints import cache
+from settings import settings
+
+deviation_pool = pubsub.Pool(
+    "deviation",
+    settings.telemetry_queue_size,
+    settings.telemetry_queue_policy,
+)
+
+
+class Tracker:
+    def __init__(self, course: analytics.course.Course | None) -> None:
+        self.course = course
+
+    def update(
+        self,
+        state: CourseTracker,
+        telemetry: models.telemetry.Telemetry,
+    ) -> list[models.ship.CourseEvent]:
+        if self.course is None or (
+            state.datetime is not None and telemetry.datetime < state.datetime
+        ):
+            return []
+
+        state.datetime = telemetry.datetime
+        position = self.course.locate(telemetry.longitude, telemetry.latitude)
+        events = []
+
+        deviated = position.distance > settings.course_deviation_distance
+        if deviated != state.deviated:
+            state.deviated = deviated
+            events.append("deviation" if deviated else "return")
+
+        if not state.arrived and position.remaining <= settings.course_arrival_distance:
+            state.arrived = True
+            events.append("arrival")
+
+        return [
+            models.ship.CourseEvent(
+                type=event,
+                telemetry_id=telemetry.id,
+                datetime=telemetry.datetime,
+                distance=position.distance,
+                progress=position.progress,
+                remaining=position.remaining,
+            )
+            for event in events
+        ]
+
+
+trackers: cache.TTLCache[int, Tracker] = cache.TTLCache(
+    "course",
+    settings.course_cache_size,
+    settings.course_cache_ttl,
+    sliding=True,
+)
+
+
+def forget(ship_id: int) -> None:
+    trackers.remove(lambda key: key == ship_id)
+
+
+async def load(session: AsyncSession, ship_ids: set[int]) -> dict[int, Tracker]:
+    result = {}
+    for ship_id in ship_ids:
+        tracker = trackers.get(ship_id)
+        if tracker is not None:
+            result[ship_id] = tracker
+
+    missing = ship_ids - result.keys()
+    if len(missing) != 0:
+        ships = await session.execute(
+            select(Ship.id, Ship.course).where(Ship.id.in_(missing))
+        )
+        for ship in ships:
+            result[ship.id] = Tracker(
+                analytics.course.Course(ship.course) if ship.course else None
+            )
+            trackers.set(ship.id, result[ship.id])
+
+    return result
+
+
+async def lock_states(
+    session: AsyncSession,
+    ship_ids: set[int],
+) -> dict[int, CourseTracker]:
+    statement = (
+        select(CourseTracker)
+        .where(CourseTracker.ship_id.in_(ship_ids))
+        .order_by(CourseTracker.ship_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    states = {state.ship_id: state for state in await session.scalars(statement)}
+
+    missing = ship_ids - states.keys()
+    if len(missing) != 0:
+        await session.execute(
+            insert(CourseTracker)
+            .values([{"ship_id": ship_id} for ship_id in sorted(missing)])
+            .on_conflict_do_nothing()
+        )
+        states.update(
+            (state.ship_id, state)
+            for state in await session.scalars(
+                statement.where(CourseTracker.ship_id.in_(missing))
+            )
+        )
+
+    return states
+
+
+async def process(
+    session: AsyncSession,
+    telemetry_models: list[models.telemetry.Telemetry],
+) -> None:
+    loaded = {
+        ship_id: tracker
+        for ship_id, tracker in (
+            await load(session, {t.ship_id for t in telemetry_models})
+        ).items()
+        if tracker.course is not None
+    }
+    if len(loaded) == 0:
+        return
+
+    states = await lock_states(session, set(loaded))
+
+    messages = []
+    for telemetry_model in sorted(telemetry_models, key=lambda t: (t.datetime, t.id)):
+        tracker = loaded.get(telemetry_model.ship_id)
+        state = states.get(telemetry_model.ship_id)
+        if tracker is None or state is None:
+            continue
+
+        messages.extend(
+            (telemetry_model.ship_id, event.dumps())
+            for event in tracker.update(state, telemetry_model)
+        )
+
+    await session.flush()
+    await deviation_pool.publish_many(messages, session)
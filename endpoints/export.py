@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.responses import StreamingResponse
+from sqlalchemy import BigInteger, DateTime, Float, Integer, Row, Select
+from sqlalchemy.ext.asyncio import AsyncResult
+
+import database
+import models
+from settings import settings
+
+media_types = {
+    models.telemetry.ExportFormat.ndjson: "application/x-ndjson",
+    models.telemetry.ExportFormat.csv: "text/csv",
+    models.telemetry.ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+    models.telemetry.ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+columnar_formats = {
+    models.telemetry.ExportFormat.arrow,
+    models.telemetry.ExportFormat.parquet,
+}
+arrow_types = (
+    (BigInteger, pa.int64()),
+    (Integer, pa.int32()),
+    (Float, pa.float64()),
+    (DateTime, pa.timestamp("us", tz="UTC")),
+)
+
+
+class Sink(io.RawIOBase):
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self.chunks.append(chunk)
+        self.position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def get_schema(statement: Select[Any]) -> pa.Schema:
+    return pa.schema(
+        [
+            pa.field(
+                column.name,
+                next(
+                    arrow_type
+                    for sql_type, arrow_type in arrow_types
+                    if isinstance(column.type, sql_type)
+                ),
+                nullable=False,
+            )
+            for column in statement.selected_columns
+        ]
+    )
+
+
+def encode_ndjson(rows: list[Row[Any]]) -> str:
+    buffer = io.StringIO()
+
+    for row in rows:
+        data = row._asdict()
+        data["datetime"] = data["datetime"].isoformat()
+        buffer.write(json.dumps(data))
+        buffer.write("\n")
+
+    return buffer.getvalue()
+
+
+def encode_csv(rows: Iterable[Iterable[Any]]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value for value in row
+        )
+
+    return buffer.getvalue()
+
+
+def encode_batch(rows: list[Row[Any]], schema: pa.Schema) -> pa.RecordBatch:
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(column, type=field.type)
+            for column, field in zip(zip(*rows), schema)
+        ],
+        schema=schema,
+    )
+
+
+async def stream_columnar(
+    result: AsyncResult[Any],
+    schema: pa.Schema,
+    format: models.telemetry.ExportFormat,
+) -> AsyncIterator[bytes]:
+    sink = Sink()
+    writer = (
+        pq.ParquetWriter(sink, schema)
+        if format == models.telemetry.ExportFormat.parquet
+        else pa.ipc.new_stream(sink, schema)
+    )
+
+    async for rows in result.partitions():
+        writer.write_batch(encode_batch(rows, schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+async def stream_rows(
+    statement: Select[Any],
+    format: models.telemetry.ExportFormat,
+    chunk_size: int,
+) -> AsyncIterator[str | bytes]:
+    async with database.sessions.begin() as session:
+        if format in columnar_formats:
+            result = await session.stream(
+                statement.execution_options(yield_per=settings.columnar_batch_size)
+            )
+            async for chunk in stream_columnar(result, get_schema(statement), format):
+                yield chunk
+            return
+
+        result = await session.stream(statement.execution_options(yield_per=chunk_size))
+
+        if format == models.telemetry.ExportFormat.csv:
+            yield encode_csv([result.keys()])
+
+        async for rows in result.partitions():
+            if format == models.telemetry.ExportFormat.csv:
+                yield encode_csv(rows)
+            else:
+                yield encode_ndjson(rows)
+
+
+def export(
+    statement: Select[Any],
+    format: models.telemetry.ExportFormat,
+    filename: str,
+    chunk_size: int = 1000,
+) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(statement, format, chunk_size),
+        media_type=media_types[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format.value}"'
+        },
+    )
@@ -0,0 +1,122 @@
+import asyncio
+
+import pydantic
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from sqlalchemy import and_, select
+
+import database
+import models
+import pubsub
+from database.ship import Ship
+from endpoints import dependencies
+from endpoints.deviation import deviation_pool
+from endpoints.ship import course_pool
+from endpoints.telemetry import telemetry_pool
+from settings import settings
+
+router = APIRouter(prefix="/fleet", tags=["Fleet"])
+fleet_pools = (telemetry_pool, course_pool, deviation_pool)
+
+
+async def subscribe(
+    user: database.user.User,
+    subscriber: pubsub.Subscriber,
+    ships: set[int],
+    ids: list[int],
+) -> models.fleet.Subscription:
+    async with database.sessions.begin() as session:
+        owned_ids = set(
+            await session.scalars(
+                select(Ship.id).where(
+                    and_(
+                        Ship.id.in_(ids),
+                        Ship.owner_id == user.id,
+                    )
+                )
+            )
+        )
+
+    for id in owned_ids - ships:
+        for pool in fleet_pools:
+            pool.subscribe(id, subscriber)
+    ships |= owned_ids
+
+    return models.fleet.Subscription(
+        type="subscribed",
+        ships=sorted(owned_ids),
+        missing=sorted(set(ids) - owned_ids),
+    )
+
+
+def unsubscribe(
+    subscriber: pubsub.Subscriber,
+    ships: set[int],
+    ids: list[int],
+) -> models.fleet.Subscription:
+    removed_ids = ships & set(ids)
+
+    for id in removed_ids:
+        for pool in fleet_pools:
+            pool.unsubscribe(id, subscriber)
+    ships -= removed_ids
+
+    return models.fleet.Subscription(type="unsubscribed", ships=sorted(removed_ids))
+
+
+async def receive(
+    websocket: WebSocket,
+    user: database.user.User,
+    subscriber: pubsub.Subscriber,
+    ships: set[int],
+) -> None:
+    try:
+        while True:
+            try:
+                command = models.fleet.Command.parse_raw(await websocket.receive_text())
+            except pydantic.ValidationError as error:
+                await websocket.send_text(models.fleet.Error(detail=str(error)).dumps())
+                continue
+
+            if command.action == "subscribe":
+                reply = await subscribe(user, subscriber, ships, command.ships)
+            else:
+                reply = unsubscribe(subscriber, ships, command.ships)
+
+            await websocket.send_text(reply.dumps())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscriber.close()
+
+
+@router.websocket("/listen")
+async def listen(websocket: WebSocket, user: dependencies.QueryUser) -> None:
+    await websocket.accept()
+
+    subscriber = pubsub.Subscriber(
+        f"fleet {user.id}",
+        settings.telemetry_queue_size,
+        settings.telemetry_queue_policy,
+    )
+    ships: set[int] = set()
+    reader = asyncio.create_task(receive(websocket, user, subscriber, ships))
+
+    try:
+        while True:
+            message = await subscriber.get()
+            if message is None:
+                break
+
+            await websocket.send_text(
+                f'{{"type":"{message.channel}","ship_id":{message.key},'
+                f'"data":{message.data}}}'
+            )
+
+        if not reader.done():
+            await websocket.close(1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        unsubscribe(subscriber, ships, list(ships))
+        subscriber.close()
@@ -0,0 +1,182 @@
+import asyncio
+import struct
+from datetime import UTC, date, datetime
+from typing import Any
+
+import numpy as np
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, WebSocketException
+from sqlalchemy import and_, select
+from sqlalchemy.dialects.postgresql import insert
+
+import database
+from database.ingest import IngestCursor
+from database.ship import Ship
+from endpoints import dependencies, telemetry
+from settings import settings
+
+router = APIRouter(prefix="/telemetry", tags=["Telemetry"])
+
+frame = np.dtype(
+    [
+        ("sequence", "<u4"),
+        ("datetime", "<f8"),
+        ("longitude", "<f8"),
+        ("latitude", "<f8"),
+        ("angle", "<f4"),
+        ("temperature", "<f4"),
+        ("voltage", "<f4"),
+        ("velocity", "<f4"),
+    ]
+)
+fields = ("longitude", "latitude", "angle", "temperature", "voltage", "velocity")
+ack = struct.Struct("<I")
+
+
+def get_timestamp(month: date) -> float:
+    return datetime(month.year, month.month, 1, tzinfo=UTC).timestamp()
+
+
+def decode(data: bytes, ship_id: int, after: int) -> list[dict[str, Any]]:
+    if len(data) % frame.itemsize != 0:
+        raise WebSocketException(1007, "Invalid frame length")
+
+    records = np.frombuffer(data, dtype=frame)
+    start, end = map(get_timestamp, database.partition.get_range())
+    if not (
+        (records["sequence"] != 0).all()
+        and all(np.isfinite(records[name]).all() for name in fields)
+        and ((records["datetime"] >= start) & (records["datetime"] < end)).all()
+    ):
+        raise WebSocketException(1007, "Invalid frame values")
+
+    records = records[records["sequence"] > after]
+
+    datetimes = (
+        (records["datetime"] * 1e6).astype(np.int64).astype("datetime64[us]").tolist()
+    )
+    columns = [records[name].astype(np.float64).tolist() for name in fields]
+
+    return [
+        {
+            "sequence": sequence,
+            "ship_id": ship_id,
+            "datetime": datetime,
+            **dict(zip(fields, values)),
+        }
+        for sequence, datetime, *values in zip(
+            records["sequence"].tolist(), datetimes, *columns
+        )
+    ]
+
+
+async def flush(ship_id: int, records: list[dict[str, Any]]) -> int:
+    sequence = records[-1]["sequence"]
+    values = [
+        {key: value for key, value in record.items() if key != "sequence"}
+        for record in records
+    ]
+    await database.partition.ensure(value["datetime"] for value in values)
+
+    async with database.sessions.begin() as session:
+        await telemetry.store(session, values)
+
+        statement = insert(IngestCursor).values(ship_id=ship_id, sequence=sequence)
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["ship_id"],
+                set_={"sequence": statement.excluded.sequence},
+                where=IngestCursor.sequence < statement.excluded.sequence,
+            )
+        )
+
+    return sequence
+
+
+async def receive(
+    websocket: WebSocket,
+    ship_id: int,
+    after: int,
+    records: list[dict[str, Any]],
+    full: asyncio.Event,
+    space: asyncio.Event,
+) -> None:
+    while True:
+        try:
+            data = await websocket.receive_bytes()
+        except KeyError:
+            raise WebSocketException(1003, "Expected binary frames")
+
+        decoded = decode(data, ship_id, after)
+        if len(decoded) == 0:
+            continue
+
+        after = decoded[-1]["sequence"]
+        records.extend(decoded)
+        if len(records) >= settings.ingest_batch_size:
+            full.set()
+
+        while len(records) >= 2 * settings.ingest_batch_size:
+            space.clear()
+            await space.wait()
+
+
+@router.websocket("/ingest")
+async def ingest(
+    websocket: WebSocket,
+    user: dependencies.QueryUser,
+    id: int,
+) -> None:
+    await websocket.accept()
+
+    async with database.sessions.begin() as session:
+        if (
+            await session.scalar(
+                select(Ship).where(
+                    and_(
+                        Ship.id == id,
+                        Ship.owner_id == user.id,
+                    )
+                )
+            )
+            is None
+        ):
+            raise WebSocketException(1007, "Ship not found")
+
+        after = await session.scalar(
+            select(IngestCursor.sequence).where(IngestCursor.ship_id == id)
+        )
+
+    if after is None:
+        after = 0
+
+    await websocket.send_bytes(ack.pack(after))
+
+    records: list[dict[str, Any]] = []
+    full = asyncio.Event()
+    space = asyncio.Event()
+    reader = asyncio.create_task(receive(websocket, id, after, records, full, space))
+
+    try:
+        while not reader.done():
+            waiter = asyncio.create_task(full.wait())
+            await asyncio.wait(
+                [reader, waiter],
+                timeout=settings.ingest_flush_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            waiter.cancel()
+            full.clear()
+
+            if len(records) != 0:
+                batch = records[:]
+                records.clear()
+                space.set()
+                await websocket.send_bytes(ack.pack(await flush(id, batch)))
+
+        reader.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        if len(records) != 0:
+            await flush(id, records)
@@ -0,0 +1,62 @@
+import time
+from typing import Any
+
+import prometheus_client
+from fastapi import APIRouter, Response
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+router = APIRouter(tags=["Metrics"])
+
+request_seconds = Histogram(
+    "brainyboat_http_request_seconds",
+    "Time spent handling HTTP requests per route",
+    ["method", "route", "status"],
+)
+requests_in_flight = Gauge(
+    "brainyboat_http_requests_in_flight",
+    "HTTP requests currently being handled",
+)
+telemetry_ingested = Counter(
+    "brainyboat_telemetry_ingested",
+    "Telemetry points stored",
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            requests_in_flight.dec()
+            route: Any = scope.get("route")
+            request_seconds.labels(
+                scope["method"],
+                "unmatched" if route is None else route.path,
+                str(status),
+            ).observe(time.perf_counter() - start)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    return Response(
+        prometheus_client.generate_latest(),
+        media_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,16 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse as BaseJSONResponse
+from pydantic.json import pydantic_encoder
+from sqlalchemy import Result
+
+
+class JSONResponse(BaseJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=pydantic_encoder)
+
+
+def get_rows(result: Result[Any]) -> list[dict[str, Any]]:
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -1,28 +1,59 @@
-import json
-from asyncio import Queue
+import math
+from datetime import datetime, timedelta
+from typing import Annotated
 
+import numpy as np
+import orjson
 from fastapi import (
     APIRouter,
     HTTPException,
+    Query,
+    Response,
     WebSocket,
     WebSocketDisconnect,
     WebSocketException,
 )
-from sqlalchemy import and_, delete, select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Integer, and_, any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
 
+import analytics
 import database
 import models
+import pubsub
+from database.course import CourseTracker
+from database.rollup import TelemetryRollup
 from database.ship import Ship
+from database.state import ShipState
 from database.telemetry import Telemetry
-from endpoints import dependencies
+from endpoints import dependencies, deviation, export, responses, trips
+from settings import settings
 
 router = APIRouter(prefix="/ship", tags=["Ships"])
-course_pool: dict[int, set[Queue[list[tuple[float, float]] | None]]] = {}
 
 
-@router.get("/get/id")
-async def get_by_id(user: dependencies.HeaderUser, id: int) -> models.ship.Ship:
+async def load_course(id: int) -> str | None:
     async with database.sessions.begin() as session:
+        ship = (await session.execute(select(Ship.course).where(Ship.id == id))).first()
+        return None if ship is None else orjson.dumps(ship.course).decode("UTF-8")
+
+
+course_pool = pubsub.Pool(
+    "course",
+    settings.course_queue_size,
+    "latest",
+    reload=load_course,
+    watch=lambda key, _: deviation.forget(key),
+)
+
+
+@router.get("/get/id")
+async def get_by_id(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    id: int,
+) -> models.ship.Ship:
+    async with dependencies.transaction(session):
         ship = await session.scalar(
             select(Ship).where(
                 and_(
@@ -35,12 +66,16 @@ async def get_by_id(user: dependencies.HeaderUser, id: int) -> models.ship.Ship:
         if ship is None:
             raise HTTPException(404, "Ship not found")
 
-        return models.ship.Ship.from_orm(ship)
+        return models.ship.Ship.create(ship, user)
 
 
 @router.get("/get/imai")
-async def get_by_imai(user: dependencies.HeaderUser, imai: int) -> models.ship.Ship:
-    async with database.sessions.begin() as session:
+async def get_by_imai(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    imai: int,
+) -> models.ship.Ship:
+    async with dependencies.transaction(session):
         ship = await session.scalar(
             select(Ship).where(
                 and_(
@@ -53,44 +88,334 @@ async def get_by_imai(user: dependencies.HeaderUser, imai: int) -> models.ship.S
         if ship is None:
             raise HTTPException(404, "Ship not found")
 
-        return models.ship.Ship.from_orm(ship)
+        return models.ship.Ship.create(ship, user)
 
 
 @router.get("/get/my")
-async def get_my(user: dependencies.HeaderUser) -> list[models.ship.Ship]:
-    async with database.sessions.begin() as session:
+async def get_my(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+) -> list[models.ship.Ship]:
+    async with dependencies.transaction(session):
         ships = await session.scalars(select(Ship).where(Ship.owner_id == user.id))
-        return [models.ship.Ship.from_orm(ship) for ship in ships]
+        return [models.ship.Ship.create(ship, user) for ship in ships]
 
 
-@router.get("/get/telemetry")
+@router.get("/get/my/latest")
+async def get_my_latest(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+) -> list[models.ship.ShipState]:
+    async with dependencies.transaction(session):
+        rows = await session.execute(
+            select(Ship, ShipState)
+            .outerjoin(ShipState)
+            .where(Ship.owner_id == user.id)
+            .order_by(Ship.id)
+        )
+        return [models.ship.ShipState.create(ship, user, state) for ship, state in rows]
+
+
+@router.get("/get/telemetry", response_model=list[models.telemetry.Telemetry])
 async def get_telemetry(
     user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
     id: int,
-    desc: bool = True,
-) -> list[models.telemetry.Telemetry]:
-    async with database.sessions.begin() as session:
-        telemetry = await session.scalars(
-            select(Telemetry)
+) -> Response:
+    async with dependencies.transaction(session):
+        rows = responses.get_rows(
+            await session.execute(
+                history.apply(
+                    select(*database.telemetry.fields)
+                    .join(Ship)
+                    .where(
+                        and_(
+                            Telemetry.ship_id == id,
+                            Ship.owner_id == user.id,
+                        )
+                    )
+                )
+            )
+        )
+
+    response = responses.JSONResponse(rows)
+    history.set_cursor(response, rows)
+    return response
+
+
+@router.get("/get/telemetry/export")
+async def export_telemetry(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    id: int,
+    format: models.telemetry.ExportFormat = models.telemetry.ExportFormat.ndjson,
+) -> StreamingResponse:
+    async with dependencies.transaction(session):
+        if (
+            await session.scalar(
+                select(Ship).where(
+                    and_(
+                        Ship.id == id,
+                        Ship.owner_id == user.id,
+                    )
+                )
+            )
+            is None
+        ):
+            raise HTTPException(404, "Ship not found")
+
+    return export.export(
+        history.apply(
+            select(*database.telemetry.fields).where(Telemetry.ship_id == id)
+        ),
+        format,
+        f"ship-{id}-telemetry",
+    )
+
+
+@router.get("/get/telemetry/buckets")
+async def get_telemetry_buckets(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    id: int,
+    width: timedelta | None = None,
+    points: Annotated[int | None, Query(gt=0)] = None,
+) -> list[models.telemetry.TelemetryBucket]:
+    if width is not None and width < timedelta(seconds=1):
+        raise HTTPException(422, "Bucket width must be at least one second")
+
+    condition = and_(Telemetry.ship_id == id, Ship.owner_id == user.id)
+
+    async with dependencies.transaction(session):
+        if width is None:
+            if points is None:
+                raise HTTPException(422, "Either width or points is required")
+
+            since, until = history.since, history.until
+            if since is None or until is None:
+                bounds = (
+                    await session.execute(
+                        history.filter(
+                            select(
+                                func.min(Telemetry.datetime),
+                                func.max(Telemetry.datetime),
+                            )
+                            .join(Ship)
+                            .where(condition)
+                        )
+                    )
+                ).one()
+                since, until = since or bounds[0], until or bounds[1]
+
+            if since is None or until is None:
+                return []
+
+            origin = since
+            width = timedelta(
+                seconds=max(math.ceil((until - since).total_seconds() / points), 1)
+            )
+        else:
+            origin = datetime(2000, 1, 1)
+
+        bucket = func.date_bin(width, Telemetry.datetime, origin)
+        columns = [Telemetry.temperature, Telemetry.voltage, Telemetry.velocity]
+        statement = (
+            select(
+                bucket,
+                func.count(),
+                func.avg(Telemetry.longitude),
+                func.avg(Telemetry.latitude),
+                *[
+                    aggregate(column)
+                    for column in columns
+                    for aggregate in (func.min, func.max, func.avg)
+                ],
+            )
             .join(Ship)
-            .where(
+            .where(condition)
+            .group_by(bucket)
+            .order_by(bucket.desc() if history.desc else bucket)
+        )
+
+        if history.limit is not None:
+            statement = statement.limit(history.limit)
+
+        buckets = await session.execute(history.filter(statement))
+
+        return [
+            models.telemetry.TelemetryBucket(
+                datetime=row[0],
+                count=row[1],
+                longitude=row[2],
+                latitude=row[3],
+                **{
+                    column.key: models.telemetry.Aggregate(
+                        min=row[4 + 3 * index],
+                        max=row[5 + 3 * index],
+                        avg=row[6 + 3 * index],
+                    )
+                    for index, column in enumerate(columns)
+                },
+            )
+            for row in buckets
+        ]
+
+
+@router.get("/get/telemetry/track", response_model=list[models.telemetry.Telemetry])
+async def get_telemetry_track(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    id: int,
+    tolerance: Annotated[float | None, Query(ge=0)] = None,
+    points: Annotated[int | None, Query(gt=1)] = None,
+) -> Response:
+    if tolerance is None and points is None:
+        raise HTTPException(422, "Either tolerance or points is required")
+
+    async with dependencies.transaction(session):
+        track = (
+            await session.execute(
+                history.filter(
+                    select(Telemetry.id, Telemetry.longitude, Telemetry.latitude)
+                    .join(Ship)
+                    .where(
+                        and_(
+                            Telemetry.ship_id == id,
+                            Ship.owner_id == user.id,
+                        )
+                    )
+                    .order_by(Telemetry.datetime, Telemetry.id)
+                )
+            )
+        ).all()
+        if len(track) == 0:
+            return responses.JSONResponse([])
+
+        ids, longitude, latitude = map(np.array, zip(*track))
+        keep = analytics.track.simplify(longitude, latitude, tolerance, points)
+        kept = bindparam("ids", ids[keep].tolist(), ARRAY(Integer))
+
+        statement = history.filter(
+            select(*database.telemetry.fields).where(
                 and_(
-                    Ship.id == id,
-                    Ship.owner_id == user.id,
+                    Telemetry.ship_id == id,
+                    Telemetry.id == any_(kept),
                 )
             )
-            .order_by(Telemetry.id.desc() if desc else Telemetry.id)
         )
+        if history.desc:
+            statement = statement.order_by(
+                Telemetry.datetime.desc(), Telemetry.id.desc()
+            )
+        else:
+            statement = statement.order_by(Telemetry.datetime, Telemetry.id)
+
+        rows = responses.get_rows(await session.execute(statement))
 
-        return [models.telemetry.Telemetry.from_orm(t) for t in telemetry]
+    return responses.JSONResponse(rows)
+
+
+@router.get("/get/trips")
+async def get_trips(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    id: int,
+) -> list[models.ship.Trip]:
+    async with dependencies.transaction(session):
+        if (
+            await session.scalar(
+                select(Ship).where(
+                    and_(
+                        Ship.id == id,
+                        Ship.owner_id == user.id,
+                    )
+                )
+            )
+            is None
+        ):
+            raise HTTPException(404, "Ship not found")
+
+        voyage = await trips.load(session, id)
+
+    selected, active = trips.select_trips(voyage, history.since, history.until)
+    result = [trips.create(trip, flag) for trip, flag in zip(selected, active)]
+    if history.desc:
+        result.reverse()
+
+    return result[: history.limit]
+
+
+@router.get("/get/trip-stats")
+async def get_trip_stats(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    id: int,
+) -> models.ship.TripStats:
+    async with dependencies.transaction(session):
+        if (
+            await session.scalar(
+                select(Ship).where(
+                    and_(
+                        Ship.id == id,
+                        Ship.owner_id == user.id,
+                    )
+                )
+            )
+            is None
+        ):
+            raise HTTPException(404, "Ship not found")
+
+        voyage = await trips.load(session, id)
+
+    return trips.aggregate(trips.select_trips(voyage, history.since, history.until)[0])
+
+
+@router.get("/get/rollups")
+async def get_rollups(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    id: int,
+    resolution: models.telemetry.Resolution = models.telemetry.Resolution.hour,
+) -> list[models.telemetry.TelemetryRollup]:
+    async with dependencies.transaction(session):
+        rollups = await session.scalars(
+            history.filter(
+                select(TelemetryRollup)
+                .join(Ship)
+                .where(
+                    and_(
+                        TelemetryRollup.ship_id == id,
+                        TelemetryRollup.resolution == resolution.value,
+                        Ship.owner_id == user.id,
+                    )
+                )
+                .order_by(
+                    TelemetryRollup.bucket.desc()
+                    if history.desc
+                    else TelemetryRollup.bucket
+                )
+                .limit(history.limit),
+                TelemetryRollup.bucket,
+            )
+        )
+
+        return [models.telemetry.TelemetryRollup.create(r) for r in rollups]
 
 
 @router.post("/add")
 async def add_ship(
     user: dependencies.HeaderUser,
+    session: dependencies.Session,
     ship_model: models.ship.AddShip,
 ) -> models.ship.Ship:
-    async with database.sessions.begin() as session:
+    async with dependencies.transaction(session):
         if (
             await session.scalar(select(Ship).where(Ship.imai == ship_model.imai))
             is not None
@@ -108,16 +433,17 @@ async def add_ship(
         await session.flush()
         await session.refresh(ship)
 
-        return models.ship.Ship.from_orm(ship)
+        return models.ship.Ship.create(ship, user)
 
 
 @router.put("/update/course")
 async def update_course(
     user: dependencies.HeaderUser,
+    session: dependencies.Session,
     id: int,
     course: list[tuple[float, float]] | None = None,
 ) -> models.ship.Ship:
-    async with database.sessions.begin() as session:
+    async with dependencies.transaction(session):
         ship = await session.scalar(
             select(Ship).where(
                 and_(
@@ -131,22 +457,26 @@ async def update_course(
             raise HTTPException(404, "Ship is not found")
 
         ship.course = course
+        await session.execute(
+            delete(CourseTracker).where(CourseTracker.ship_id == ship.id)
+        )
         await session.flush()
 
-        if ship.id in course_pool:
-            for queue in course_pool[ship.id]:
-                await queue.put(course)
+        result = models.ship.Ship.create(ship, user)
 
-        return models.ship.Ship.from_orm(ship)
+    deviation.forget(result.id)
+    await course_pool.publish(result.id, orjson.dumps(course).decode("UTF-8"))
+    return result
 
 
 @router.put("/update")
 async def update(
     user: dependencies.HeaderUser,
+    session: dependencies.Session,
     id: int,
     ship_model: models.ship.AddShip,
 ) -> models.ship.Ship:
-    async with database.sessions.begin() as session:
+    async with dependencies.transaction(session):
         ship = await session.scalar(
             select(Ship).where(
                 and_(
@@ -165,12 +495,16 @@ async def update(
 
         await session.flush()
 
-        return models.ship.Ship.from_orm(ship)
+        return models.ship.Ship.create(ship, user)
 
 
 @router.delete("/delete")
-async def delete_ship(user: dependencies.HeaderUser, id: int) -> models.ship.Ship:
-    async with database.sessions.begin() as session:
+async def delete_ship(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    id: int,
+) -> models.ship.Ship:
+    async with dependencies.transaction(session):
         ship = await session.scalar(
             select(Ship).where(
                 and_(
@@ -184,14 +518,18 @@ async def delete_ship(user: dependencies.HeaderUser, id: int) -> models.ship.Shi
             raise HTTPException(404, "Ship not found")
 
         await session.delete(ship)
-        return models.ship.Ship.from_orm(ship)
+        await trips.forget(session, [id])
+        return models.ship.Ship.create(ship, user)
 
 
 @router.delete("/delete/telemetry")
 async def delete_telemetry(
-    user: dependencies.HeaderUser, id: int
-) -> list[models.telemetry.Telemetry]:
-    async with database.sessions.begin() as session:
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    id: int,
+    count: bool = False,
+) -> list[models.telemetry.Telemetry] | models.telemetry.TelemetryCount:
+    async with dependencies.transaction(session):
         ship = await session.scalar(
             select(Ship).where(
                 and_(
@@ -204,11 +542,27 @@ async def delete_telemetry(
         if ship is None:
             raise HTTPException(404, "Ship not found")
 
-        telemetry = await session.scalars(
-            delete(Telemetry).where(Telemetry.ship_id == id).returning(Telemetry)
+        await session.execute(
+            delete(TelemetryRollup).where(TelemetryRollup.ship_id == id)
+        )
+        await session.execute(delete(ShipState).where(ShipState.ship_id == id))
+        await trips.forget(session, [id])
+
+        if count:
+            result = await session.execute(
+                delete(Telemetry)
+                .where(Telemetry.ship_id == id)
+                .execution_options(synchronize_session=False)
+            )
+            return models.telemetry.TelemetryCount(count=result.rowcount)
+
+        rows = await session.execute(
+            delete(Telemetry)
+            .where(Telemetry.ship_id == id)
+            .returning(*database.telemetry.fields)
         )
 
-        return [models.telemetry.Telemetry.from_orm(t) for t in telemetry]
+        return [models.telemetry.Telemetry.from_orm(row) for row in rows]
 
 
 @router.websocket("/listen/course")
@@ -219,8 +573,44 @@ async def listen_course(
 ) -> None:
     await websocket.accept()
 
-    if id not in course_pool:
-        course_pool[id] = set()
+    async with database.sessions.begin() as session:
+        if (
+            await session.scalar(
+                select(Ship).where(
+                    and_(
+                        Ship.id == id,
+                        Ship.owner_id == user.id,
+                    )
+                )
+            )
+            is None
+        ):
+            raise WebSocketException(1007, "Ship not found")
+
+    subscriber = course_pool.subscribe(id)
+
+    try:
+        while True:
+            message = await subscriber.get()
+            if message is None:
+                await websocket.close(1013)
+                break
+
+            await websocket.send_text(message.data)
+    except WebSocketDisconnect:
+        await websocket.close()
+    finally:
+        course_pool.unsubscribe(id, subscriber)
+        subscriber.close()
+
+
+@router.websocket("/listen/deviation")
+async def listen_deviation(
+    websocket: WebSocket,
+    user: dependencies.QueryUser,
+    id: int,
+) -> None:
+    await websocket.accept()
 
     async with database.sessions.begin() as session:
         if (
@@ -236,15 +626,18 @@ async def listen_course(
         ):
             raise WebSocketException(1007, "Ship not found")
 
-    queue: Queue[list[tuple[float, float]] | None] = Queue()
-    course_pool[id].add(queue)
+    subscriber = deviation.deviation_pool.subscribe(id)
 
     try:
         while True:
-            course = await queue.get()
-            await websocket.send_text(json.dumps(course))
+            message = await subscriber.get()
+            if message is None:
+                await websocket.close(1013)
+                break
+
+            await websocket.send_text(message.data)
     except WebSocketDisconnect:
-        course_pool[id].remove(queue)
-        if len(course_pool[id]) == 0:
-            course_pool.pop(id)
         await websocket.close()
+    finally:
+        deviation.deviation_pool.unsubscribe(id, subscriber)
+        subscriber.close()
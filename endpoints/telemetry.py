@@ -1,69 +1,302 @@
-from asyncio import Queue
 from datetime import UTC
+from typing import Annotated, Any
 
 from fastapi import (
     APIRouter,
     HTTPException,
+    Query,
+    Response,
     WebSocket,
     WebSocketDisconnect,
     WebSocketException,
 )
-from sqlalchemy import and_, select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import ColumnElement, and_, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import analytics
 import database
 import models
+import pubsub
+from database.rollup import TelemetryRollup, haversine
 from database.ship import Ship
 from database.telemetry import Telemetry
-from endpoints import dependencies
+from database.user import User
+from endpoints import dependencies, deviation, export, metrics, responses, trips
+from endpoints.writer import Writer
+from settings import settings
 
 router = APIRouter(prefix="/telemetry", tags=["Telemetry"])
-telemetry_pool: dict[int, set[Queue[models.telemetry.Telemetry]]] = {}
+telemetry_pool = pubsub.Pool(
+    "telemetry",
+    settings.telemetry_queue_size,
+    settings.telemetry_queue_policy,
+)
+
+
+def get_values(telemetry_model: models.telemetry.AddTelemetry) -> dict[str, Any]:
+    return {
+        "ship_id": telemetry_model.ship_id,
+        "datetime": telemetry_model.datetime.astimezone(UTC).replace(tzinfo=None),
+        "longitude": telemetry_model.longitude,
+        "latitude": telemetry_model.latitude,
+        "angle": telemetry_model.angle,
+        "temperature": telemetry_model.temperature,
+        "voltage": telemetry_model.voltage,
+        "velocity": telemetry_model.velocity,
+    }
+
+
+async def publish(
+    telemetry_models: list[models.telemetry.Telemetry],
+    session: AsyncSession | None = None,
+) -> None:
+    await telemetry_pool.publish_many(
+        [
+            (telemetry_model.ship_id, telemetry_model.dumps())
+            for telemetry_model in telemetry_models
+        ],
+        session,
+    )
+
+
+async def store(
+    session: AsyncSession,
+    values: list[dict[str, Any]],
+) -> list[models.telemetry.Telemetry]:
+    rows = await session.execute(
+        insert(Telemetry).returning(
+            *database.telemetry.fields, sort_by_parameter_order=True
+        ),
+        values,
+    )
+
+    result = [models.telemetry.Telemetry.from_orm(row) for row in rows]
+    await update(session, result)
+    await publish(result, session)
+
+    return result
+
+
+async def update(
+    session: AsyncSession,
+    telemetry_models: list[models.telemetry.Telemetry],
+) -> None:
+    ids = [telemetry_model.id for telemetry_model in telemetry_models]
+    await database.rollup.update(session, ids)
+    await database.state.update(session, ids)
+    await deviation.process(session, telemetry_models)
+    await trips.touch(session, telemetry_models)
+    metrics.telemetry_ingested.inc(len(telemetry_models))
+
+
+async def write(session: AsyncSession, values: list[dict[str, Any]]) -> None:
+    await session.execute(insert(Telemetry), values)
+
+    result = [models.telemetry.Telemetry(**value) for value in values]
+    await update(session, result)
+    await publish(result, session)
+
+
+async def enqueue(values: list[dict[str, Any]]) -> list[models.telemetry.Telemetry]:
+    batch = await writer.submit(values, settings.telemetry_write_mode == "group_commit")
+    if batch.committed is not None:
+        await batch.committed
+
+    return [models.telemetry.Telemetry(**value) for value in batch.values]
+
+
+writer = Writer(write)
 
 
 @router.get("/get/id")
 async def get_by_id(
-    user: dependencies.HeaderUser, id: int
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    id: int,
 ) -> models.telemetry.Telemetry:
-    async with database.sessions.begin() as session:
-        telemetry = await session.scalar(
-            select(Telemetry)
-            .join(Ship)
-            .where(
-                and_(
-                    Telemetry.id == id,
-                    Ship.owner_id == user.id,
+    async with dependencies.transaction(session):
+        row = (
+            await session.execute(
+                select(*database.telemetry.fields)
+                .join(Ship)
+                .where(
+                    and_(
+                        Telemetry.id == id,
+                        Ship.owner_id == user.id,
+                    )
                 )
             )
-        )
+        ).first()
 
-        if telemetry is None:
+        if row is None:
             raise HTTPException(404, "Telemetry not found")
 
-        return models.telemetry.Telemetry.from_orm(telemetry)
+        return models.telemetry.Telemetry.from_orm(row)
 
 
-@router.get("/get/my")
+@router.get("/get/my", response_model=list[models.telemetry.Telemetry])
 async def get_my(
     user: dependencies.HeaderUser,
-    desc: bool = True,
-) -> list[models.telemetry.Telemetry]:
-    async with database.sessions.begin() as session:
-        telemetry = await session.scalars(
-            select(Telemetry)
+    session: dependencies.Session,
+    history: dependencies.History,
+) -> Response:
+    async with dependencies.transaction(session):
+        rows = responses.get_rows(
+            await session.execute(
+                history.apply(
+                    select(*database.telemetry.fields)
+                    .join(Ship)
+                    .where(Ship.owner_id == user.id)
+                )
+            )
+        )
+
+    response = responses.JSONResponse(rows)
+    history.set_cursor(response, rows)
+    return response
+
+
+async def search(
+    user: User,
+    session: AsyncSession,
+    history: dependencies.TelemetryHistory,
+    ranges: list[tuple[int, int]],
+    condition: ColumnElement[bool],
+) -> Response:
+    async with dependencies.transaction(session):
+        rows = responses.get_rows(
+            await session.execute(
+                history.apply(
+                    select(*database.telemetry.fields)
+                    .join(Ship)
+                    .where(
+                        and_(
+                            Ship.owner_id == user.id,
+                            or_(
+                                *[
+                                    Telemetry.cell.between(low, high)
+                                    for low, high in ranges
+                                ]
+                            ),
+                            condition,
+                        )
+                    )
+                )
+            )
+        )
+
+    response = responses.JSONResponse(rows)
+    history.set_cursor(response, rows)
+    return response
+
+
+@router.get("/get/my/area", response_model=list[models.telemetry.Telemetry])
+async def get_my_area(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    west: Annotated[float, Query(ge=-180, le=180)],
+    south: Annotated[float, Query(ge=-90, le=90)],
+    east: Annotated[float, Query(ge=-180, le=180)],
+    north: Annotated[float, Query(ge=-90, le=90)],
+) -> Response:
+    if south > north:
+        raise HTTPException(422, "The bounding box is invalid")
+
+    longitude = (
+        Telemetry.longitude.between(west, east)
+        if west <= east
+        else or_(Telemetry.longitude >= west, Telemetry.longitude <= east)
+    )
+
+    return await search(
+        user,
+        session,
+        history,
+        analytics.cell.cover(west, south, east, north),
+        and_(longitude, Telemetry.latitude.between(south, north)),
+    )
+
+
+@router.get("/get/my/near", response_model=list[models.telemetry.Telemetry])
+async def get_my_near(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    longitude: Annotated[float, Query(ge=-180, le=180)],
+    latitude: Annotated[float, Query(ge=-90, le=90)],
+    radius: Annotated[float, Query(gt=0)],
+) -> Response:
+    return await search(
+        user,
+        session,
+        history,
+        analytics.cell.cover(*analytics.cell.around(longitude, latitude, radius)),
+        haversine(longitude, latitude, Telemetry.longitude, Telemetry.latitude)
+        <= radius,
+    )
+
+
+@router.get("/get/my/export")
+async def export_my(
+    user: dependencies.HeaderUser,
+    history: dependencies.History,
+    format: models.telemetry.ExportFormat = models.telemetry.ExportFormat.ndjson,
+) -> StreamingResponse:
+    return export.export(
+        history.apply(
+            select(*database.telemetry.fields)
             .join(Ship)
             .where(Ship.owner_id == user.id)
-            .order_by(Telemetry.id.desc() if desc else Telemetry.id)
+        ),
+        format,
+        f"user-{user.id}-telemetry",
+    )
+
+
+@router.get("/get/my/rollups")
+async def get_my_rollups(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    history: dependencies.History,
+    resolution: models.telemetry.Resolution = models.telemetry.Resolution.day,
+) -> list[models.telemetry.TelemetryRollup]:
+    async with dependencies.transaction(session):
+        rollups = await session.scalars(
+            history.filter(
+                select(TelemetryRollup)
+                .join(Ship)
+                .where(
+                    and_(
+                        Ship.owner_id == user.id,
+                        TelemetryRollup.resolution == resolution.value,
+                    )
+                )
+                .order_by(
+                    TelemetryRollup.bucket.desc()
+                    if history.desc
+                    else TelemetryRollup.bucket,
+                    TelemetryRollup.ship_id,
+                )
+                .limit(history.limit),
+                TelemetryRollup.bucket,
+            )
         )
 
-        return [models.telemetry.Telemetry.from_orm(t) for t in telemetry]
+        return [models.telemetry.TelemetryRollup.create(r) for r in rollups]
 
 
 @router.post("/add")
 async def add(
     user: dependencies.HeaderUser,
+    session: dependencies.Session,
     telemetry_model: models.telemetry.AddTelemetry,
 ) -> models.telemetry.Telemetry:
-    async with database.sessions.begin() as session:
+    values = get_values(telemetry_model)
+    await dependencies.ensure_partitions([values["datetime"]])
+
+    async with dependencies.transaction(session):
         if (
             await session.scalar(
                 select(Ship).where(
@@ -77,27 +310,54 @@ async def add(
         ):
             raise HTTPException(404, "Ship not found")
 
-        telemetry = Telemetry(
-            ship_id=telemetry_model.ship_id,
-            datetime=telemetry_model.datetime.astimezone(UTC).replace(tzinfo=None),
-            longitude=telemetry_model.longitude,
-            latitude=telemetry_model.latitude,
-            angle=telemetry_model.angle,
-            temperature=telemetry_model.temperature,
-            voltage=telemetry_model.voltage,
-            velocity=telemetry_model.velocity,
+        if settings.telemetry_write_mode == "direct":
+            telemetry = Telemetry(**values)
+
+            session.add(telemetry)
+            await session.flush()
+            await session.refresh(telemetry)
+
+            result = models.telemetry.Telemetry.from_orm(telemetry)
+            await update(session, [result])
+            await publish([result], session)
+
+            return result
+
+    return (await enqueue([values]))[0]
+
+
+@router.post("/add/batch")
+async def add_batch(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+    telemetry_models: list[models.telemetry.AddTelemetry],
+) -> list[models.telemetry.Telemetry]:
+    if len(telemetry_models) == 0:
+        return []
+
+    ship_ids = {telemetry_model.ship_id for telemetry_model in telemetry_models}
+    values = [get_values(telemetry_model) for telemetry_model in telemetry_models]
+    await dependencies.ensure_partitions(value["datetime"] for value in values)
+
+    async with dependencies.transaction(session):
+        owned_ship_ids = set(
+            await session.scalars(
+                select(Ship.id).where(
+                    and_(
+                        Ship.id.in_(ship_ids),
+                        Ship.owner_id == user.id,
+                    )
+                )
+            )
         )
 
-        session.add(telemetry)
-        await session.flush()
-        await session.refresh(telemetry)
+        if owned_ship_ids != ship_ids:
+            raise HTTPException(404, "Ship not found")
 
-        if telemetry_model.ship_id in telemetry_pool:
-            queue_telemetry_model = models.telemetry.Telemetry.from_orm(telemetry)
-            for queue in telemetry_pool[telemetry_model.ship_id]:
-                await queue.put(queue_telemetry_model)
+        if settings.telemetry_write_mode == "direct":
+            return await store(session, values)
 
-        return models.telemetry.Telemetry.from_orm(telemetry)
+    return await enqueue(values)
 
 
 @router.websocket("/listen")
@@ -108,9 +368,6 @@ async def listen(
 ) -> None:
     await websocket.accept()
 
-    if id not in telemetry_pool:
-        telemetry_pool[id] = set()
-
     async with database.sessions.begin() as session:
         if (
             await session.scalar(
@@ -125,15 +382,18 @@ async def listen(
         ):
             raise WebSocketException(1007, "Ship not found")
 
-    queue: Queue[models.telemetry.Telemetry] = Queue()
-    telemetry_pool[id].add(queue)
+    subscriber = telemetry_pool.subscribe(id)
 
     try:
         while True:
-            telemetry = await queue.get()
-            await websocket.send_text(telemetry.json())
+            message = await subscriber.get()
+            if message is None:
+                await websocket.close(1013)
+                break
+
+            await websocket.send_text(message.data)
     except WebSocketDisconnect:
-        telemetry_pool[id].remove(queue)
-        if len(telemetry_pool[id]) == 0:
-            telemetry_pool.pop(id)
         await websocket.close()
+    finally:
+        telemetry_pool.unsubscribe(id, subscriber)
+        subscriber.close()
@@ -0,0 +1,267 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+import numpy.typing as npt
+import orjson
+from sqlalchemy import Row, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import analytics
+import models
+import pubsub
+from database.telemetry import Telemetry
+from endpoints import cache
+from settings import settings
+
+epoch = datetime(1970, 1, 1)
+
+
+def to_datetime(value: int) -> datetime:
+    return epoch + timedelta(microseconds=int(value))
+
+
+def to_time(value: datetime) -> int:
+    return (value - epoch) // timedelta(microseconds=1)
+
+
+class Voyages:
+    def __init__(self) -> None:
+        self.trips = np.zeros(0, analytics.trip.get_dtype(settings.trip_curve_points))
+        self.samples = np.zeros(0, analytics.trip.sample_dtype)
+        self.key: tuple[datetime, int] | None = None
+        self.generation = 0
+        self.lock = asyncio.Lock()
+
+    def segment(self) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        return analytics.trip.segment(
+            self.samples["time"],
+            self.samples["velocity"],
+            settings.trip_moving_velocity,
+            settings.trip_dwell_time,
+        )
+
+    def summarize(
+        self,
+        starts: npt.NDArray[np.intp],
+        ends: npt.NDArray[np.intp],
+    ) -> npt.NDArray[np.void]:
+        keep = ends - starts + 1 >= settings.trip_min_points
+        return analytics.trip.summarize(
+            self.samples,
+            starts[keep],
+            ends[keep],
+            settings.trip_curve_points,
+        )
+
+    def append(self, rows: Sequence[Row[Any]]) -> None:
+        ids, datetimes, longitude, latitude, velocity, voltage = zip(*rows)
+        chunk = np.empty(len(rows), analytics.trip.sample_dtype)
+        chunk["id"] = ids
+        chunk["time"] = np.array(datetimes, dtype="datetime64[us]").astype(np.int64)
+        chunk["longitude"] = longitude
+        chunk["latitude"] = latitude
+        chunk["velocity"] = velocity
+        chunk["voltage"] = voltage
+
+        self.samples = np.concatenate((self.samples, chunk))
+        self.key = (datetimes[-1], ids[-1])
+
+        starts, ends = self.segment()
+        time = self.samples["time"]
+        closed = int(
+            np.count_nonzero(time[-1] - time[ends] > settings.trip_dwell_time * 1e6)
+        )
+        self.trips = np.concatenate(
+            (self.trips, self.summarize(starts[:closed], ends[:closed]))
+        )
+        start = starts[closed] if closed < len(starts) else len(self.samples)
+        self.samples = self.samples[start:].copy()
+
+    def get_trips(self) -> tuple[npt.NDArray[np.void], npt.NDArray[np.bool_]]:
+        starts, ends = self.segment()
+        current = self.summarize(starts[-1:], ends[-1:])
+        return (
+            np.concatenate((self.trips, current)),
+            np.arange(len(self.trips) + len(current)) >= len(self.trips),
+        )
+
+    def rewind(self, value: datetime) -> None:
+        time = to_time(value)
+        keep = self.trips["arrival"] + settings.trip_dwell_time * 1e6 < time
+        if keep.all():
+            self.samples = self.samples[self.samples["time"] < time]
+        else:
+            self.trips = self.trips[keep]
+            self.samples = self.samples[:0]
+
+        if len(self.samples) != 0:
+            self.key = (
+                to_datetime(self.samples["time"][-1]),
+                int(self.samples["id"][-1]),
+            )
+        elif len(self.trips) != 0:
+            self.key = (
+                to_datetime(self.trips["arrival"][-1]),
+                int(self.trips["end_id"][-1]),
+            )
+        else:
+            self.key = None
+
+    def touch(self, value: datetime) -> None:
+        if self.key is None or value > self.key[0]:
+            return
+
+        self.rewind(value)
+        self.generation += 1
+
+    async def refresh(self, session: AsyncSession, ship_id: int) -> None:
+        async with self.lock:
+            if self.key is not None:
+                self.rewind(
+                    self.key[0] - timedelta(seconds=settings.trip_refresh_overlap)
+                )
+
+            while True:
+                generation = self.generation
+                statement = (
+                    select(
+                        Telemetry.id,
+                        Telemetry.datetime,
+                        Telemetry.longitude,
+                        Telemetry.latitude,
+                        Telemetry.velocity,
+                        Telemetry.voltage,
+                    )
+                    .where(Telemetry.ship_id == ship_id)
+                    .order_by(Telemetry.datetime, Telemetry.id)
+                    .limit(settings.trip_chunk_size)
+                )
+                if self.key is not None:
+                    statement = statement.where(
+                        tuple_(Telemetry.datetime, Telemetry.id) > tuple_(*self.key)
+                    )
+
+                rows = (await session.execute(statement)).all()
+                if generation != self.generation:
+                    continue
+
+                if len(rows) != 0:
+                    self.append(rows)
+
+                if len(rows) < settings.trip_chunk_size:
+                    return
+
+
+voyages: cache.TTLCache[int, Voyages] = cache.TTLCache(
+    "trip",
+    settings.trip_cache_size,
+    settings.trip_cache_ttl,
+)
+
+
+def receive(ship_id: int, data: str) -> None:
+    value = orjson.loads(data)
+    if value is None:
+        voyages.remove(lambda key: key == ship_id)
+        return
+
+    voyage = voyages.get(ship_id)
+    if voyage is not None:
+        voyage.touch(datetime.fromisoformat(value))
+
+
+trip_pool = pubsub.Pool("trip", 1, "latest", watch=receive)
+
+
+async def forget(session: AsyncSession, ship_ids: Iterable[int]) -> None:
+    await trip_pool.publish_many([(ship_id, "null") for ship_id in ship_ids], session)
+
+
+async def touch(
+    session: AsyncSession,
+    telemetry_models: list[models.telemetry.Telemetry],
+) -> None:
+    earliest: dict[int, datetime] = {}
+    for telemetry_model in telemetry_models:
+        value = earliest.get(telemetry_model.ship_id)
+        if value is None or telemetry_model.datetime < value:
+            earliest[telemetry_model.ship_id] = telemetry_model.datetime
+
+    await trip_pool.publish_many(
+        [
+            (ship_id, orjson.dumps(value).decode("UTF-8"))
+            for ship_id, value in earliest.items()
+        ],
+        session,
+    )
+
+
+async def load(session: AsyncSession, ship_id: int) -> Voyages:
+    voyage = voyages.get(ship_id)
+    if voyage is None:
+        voyage = Voyages()
+        voyages.set(ship_id, voyage)
+
+    await voyage.refresh(session, ship_id)
+    return voyage
+
+
+def select_trips(
+    voyage: Voyages,
+    since: datetime | None,
+    until: datetime | None,
+) -> tuple[npt.NDArray[np.void], npt.NDArray[np.bool_]]:
+    trips, active = voyage.get_trips()
+    keep = np.ones(len(trips), dtype=bool)
+
+    if since is not None:
+        keep &= trips["arrival"] >= to_time(since)
+
+    if until is not None:
+        keep &= trips["departure"] < to_time(until)
+
+    return trips[keep], active[keep]
+
+
+def create(trip: np.void, active: bool) -> models.ship.Trip:
+    return models.ship.Trip(
+        start_telemetry_id=int(trip["start_id"]),
+        end_telemetry_id=int(trip["end_id"]),
+        departure=to_datetime(trip["departure"]),
+        arrival=to_datetime(trip["arrival"]),
+        active=active,
+        points=int(trip["points"]),
+        distance=float(trip["distance"]),
+        duration=(int(trip["arrival"]) - int(trip["departure"])) / 1e6,
+        mean_velocity=float(trip["mean_velocity"]),
+        max_velocity=float(trip["max_velocity"]),
+        start_voltage=float(trip["start_voltage"]),
+        end_voltage=float(trip["end_voltage"]),
+        min_voltage=float(trip["min_voltage"]),
+        voltage_curve=trip["voltage_curve"].tolist(),
+    )
+
+
+def aggregate(trips: npt.NDArray[np.void]) -> models.ship.TripStats:
+    if len(trips) == 0:
+        return models.ship.TripStats(
+            trips=0,
+            distance=0,
+            duration=0,
+            mean_velocity=0,
+            max_velocity=0,
+            voltage_drain=0,
+        )
+
+    return models.ship.TripStats(
+        trips=len(trips),
+        distance=float(trips["distance"].sum()),
+        duration=float((trips["arrival"] - trips["departure"]).sum() / 1e6),
+        mean_velocity=float(
+            (trips["mean_velocity"] * trips["points"]).sum() / trips["points"].sum()
+        ),
+        max_velocity=float(trips["max_velocity"].max()),
+        voltage_drain=float((trips["start_voltage"] - trips["end_voltage"]).sum()),
+    )
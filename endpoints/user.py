@@ -2,10 +2,11 @@ import secrets
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException
-from sqlalchemy import select
+from sqlalchemy import and_, select, update
 
 import database
 import models
+import passwords
 from database.user import User
 from endpoints import dependencies
 
@@ -13,19 +14,24 @@ router = APIRouter(prefix="/user", tags=["Users"])
 
 
 @router.post("/register")
-async def register(auth: models.user.Auth) -> models.user.Token:
-    async with database.sessions.begin() as session:
+async def register(
+    session: dependencies.Session,
+    auth: models.user.Auth,
+) -> models.user.Token:
+    salt = secrets.token_hex(8)
+    password_hash = await passwords.hash(auth.password, salt)
+
+    async with dependencies.transaction(session):
         if (
             await session.scalar(select(User).where(User.username == auth.username))
             is not None
         ):
             raise HTTPException(409, "User with this username already exists")
 
-        salt = secrets.token_hex(8)
         password_updated_date = datetime.utcnow()
         user = User(
             username=auth.username,
-            password=auth.get_password_hash(salt),
+            password=password_hash,
             password_update_date=password_updated_date,
             salt=salt,
         )
@@ -40,17 +46,50 @@ async def register(auth: models.user.Auth) -> models.user.Token:
 
 
 @router.post("/login")
-async def login(auth: models.user.Auth) -> models.user.Token:
-    async with database.sessions.begin() as session:
-        user = await session.scalar(select(User).where(User.username == auth.username))
-
-        if user is None or user.password != auth.get_password_hash(user.salt):
-            raise HTTPException(401, "The username or password is incorrect")
-
-        return models.user.Token.create(
-            user.id,
-            user.password_update_date,
-        )
+async def login(
+    session: dependencies.Session,
+    auth: models.user.Auth,
+) -> models.user.Token:
+    async with dependencies.transaction(session):
+        user = (
+            await session.execute(
+                select(
+                    User.id,
+                    User.password,
+                    User.password_update_date,
+                    User.salt,
+                ).where(User.username == auth.username)
+            )
+        ).first()
+
+    if user is None:
+        await passwords.hash(auth.password, secrets.token_hex(8))
+        raise HTTPException(401, "The username or password is incorrect")
+
+    if not await passwords.verify(auth.password, user.salt, user.password):
+        raise HTTPException(401, "The username or password is incorrect")
+
+    if passwords.outdated(user.password):
+        salt = secrets.token_hex(8)
+        password_hash = await passwords.hash(auth.password, salt)
+
+        async with dependencies.transaction(session):
+            await session.execute(
+                update(User)
+                .where(
+                    and_(
+                        User.id == user.id,
+                        User.password == user.password,
+                    )
+                )
+                .values(password=password_hash, salt=salt)
+            )
+            await dependencies.forget_user(session, user.id)
+
+    return models.user.Token.create(
+        user.id,
+        user.password_update_date,
+    )
 
 
 @router.get("/me")
@@ -59,8 +98,8 @@ async def me(user: dependencies.HeaderUser) -> models.user.User:
 
 
 @router.get("/get/id")
-async def get_by_id(id: int) -> models.user.User:
-    async with database.sessions.begin() as session:
+async def get_by_id(session: dependencies.Session, id: int) -> models.user.User:
+    async with dependencies.transaction(session):
         user = await session.scalar(select(User).where(User.id == id))
 
         if user is None:
@@ -70,8 +109,11 @@ async def get_by_id(id: int) -> models.user.User:
 
 
 @router.get("/get/username")
-async def get_by_username(username: str) -> models.user.User:
-    async with database.sessions.begin() as session:
+async def get_by_username(
+    session: dependencies.Session,
+    username: str,
+) -> models.user.User:
+    async with dependencies.transaction(session):
         user = await session.scalar(select(User).where(User.username == username))
 
         if user is None:
@@ -83,9 +125,10 @@ async def get_by_username(username: str) -> models.user.User:
 @router.put("/update/username")
 async def update_username(
     user: dependencies.HeaderUser,
+    session: dependencies.Session,
     update: models.user.UpdateUsername,
 ) -> models.user.User:
-    async with database.sessions.begin() as session:
+    async with dependencies.transaction(session):
         session.add(user)
 
         if (
@@ -95,29 +138,45 @@ async def update_username(
             raise HTTPException(409, "User with this username already exists")
 
         user.username = update.username
-        return models.user.User.from_orm(user)
+        result = models.user.User.from_orm(user)
+        await dependencies.forget_user(session, user.id)
+
+    return result
 
 
 @router.put("/update/password")
 async def update_password(
     user: dependencies.HeaderUser,
+    session: dependencies.Session,
     update: models.user.UpdatePassword,
 ) -> models.user.Token:
-    async with database.sessions.begin() as session:
+    salt = secrets.token_hex(8)
+    password_hash = await passwords.hash(update.password, salt)
+
+    async with dependencies.transaction(session):
         session.add(user)
 
-        user.salt = secrets.token_hex(8)
-        user.password = update.get_password_hash(user.salt)
+        user.salt = salt
+        user.password = password_hash
         user.password_update_date = datetime.utcnow()
 
-        return models.user.Token.create(
+        token = models.user.Token.create(
             user.id,
             user.password_update_date,
         )
+        await dependencies.forget_user(session, user.id)
+
+    return token
 
 
 @router.delete("/delete")
-async def delete(user: dependencies.HeaderUser) -> models.user.User:
-    async with database.sessions.begin() as session:
+async def delete(
+    user: dependencies.HeaderUser,
+    session: dependencies.Session,
+) -> models.user.User:
+    async with dependencies.transaction(session):
         await session.delete(user)
-        return models.user.User.from_orm(user)
+        result = models.user.User.from_orm(user)
+        await dependencies.forget_user(session, user.id)
+
+    return result
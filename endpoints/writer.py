@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException
+from prometheus_client import Gauge, Histogram
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from settings import settings
+
+buffered_rows = Gauge(
+    "brainyboat_write_buffer_rows",
+    "Telemetry rows waiting for the background writer",
+)
+flush_seconds = Histogram(
+    "brainyboat_write_flush_seconds",
+    "Time spent committing one group of buffered telemetry",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+flush_rows = Histogram(
+    "brainyboat_write_flush_rows",
+    "Telemetry rows committed per group",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+
+
+class Batch:
+    def __init__(self, values: list[dict[str, Any]], wait: bool) -> None:
+        self.values = values
+        self.committed: asyncio.Future[None] | None = (
+            asyncio.get_running_loop().create_future() if wait else None
+        )
+
+    def resolve(self, error: BaseException | None) -> None:
+        if self.committed is None or self.committed.done():
+            return
+
+        if error is None:
+            self.committed.set_result(None)
+        else:
+            self.committed.set_exception(error)
+
+
+class Writer:
+    def __init__(
+        self,
+        write: Callable[[AsyncSession, list[dict[str, Any]]], Awaitable[None]],
+    ) -> None:
+        self.write = write
+        self.batches: deque[Batch] = deque()
+        self.rows = 0
+        self.ids: deque[int] = deque()
+        self.lock = asyncio.Lock()
+        self.ready = asyncio.Event()
+        self.full = asyncio.Event()
+        self.space = asyncio.Event()
+        self.task: asyncio.Task[None] | None = None
+        self.closing = False
+
+    async def allocate(self, count: int) -> list[int]:
+        async with self.lock:
+            if len(self.ids) < count:
+                async with database.sessions() as session:
+                    self.ids.extend(
+                        await database.telemetry.reserve(
+                            session,
+                            max(
+                                count - len(self.ids),
+                                settings.telemetry_write_id_block,
+                            ),
+                        )
+                    )
+
+            return [self.ids.popleft() for _ in range(count)]
+
+    async def submit(self, values: list[dict[str, Any]], wait: bool) -> Batch:
+        if self.task is None or self.closing:
+            raise HTTPException(503, "Telemetry writer is not running")
+
+        ids = await self.allocate(len(values))
+
+        while (
+            self.rows != 0 and self.rows + len(values) > settings.telemetry_write_buffer
+        ):
+            self.space.clear()
+            await self.space.wait()
+
+        batch = Batch([{"id": id, **value} for id, value in zip(ids, values)], wait)
+        self.batches.append(batch)
+        self.rows += len(values)
+        buffered_rows.inc(len(values))
+
+        self.ready.set()
+        if self.rows >= settings.telemetry_write_rows:
+            self.full.set()
+
+        return batch
+
+    async def commit(self, batches: list[Batch]) -> list[BaseException | None]:
+        try:
+            async with database.sessions.begin() as session:
+                await self.write(
+                    session, [value for batch in batches for value in batch.values]
+                )
+        except Exception as exception:
+            if len(batches) == 1:
+                logging.exception(
+                    "Failed to write %s buffered telemetry rows",
+                    len(batches[0].values),
+                )
+                return [exception]
+
+            logging.warning(
+                "Failed to write %s buffered telemetry batches together, "
+                "retrying them one by one",
+                len(batches),
+            )
+            return [error for batch in batches for error in await self.commit([batch])]
+
+        return [None] * len(batches)
+
+    async def flush(self) -> None:
+        batches: list[Batch] = []
+        rows = 0
+        while len(self.batches) != 0 and (
+            rows == 0
+            or rows + len(self.batches[0].values) <= settings.telemetry_write_rows
+        ):
+            batch = self.batches.popleft()
+            batches.append(batch)
+            rows += len(batch.values)
+
+        if len(self.batches) == 0:
+            self.ready.clear()
+        if self.rows - rows < settings.telemetry_write_rows:
+            self.full.clear()
+        if rows == 0:
+            return
+
+        started = time.perf_counter()
+        try:
+            errors = await self.commit(batches)
+        finally:
+            flush_seconds.observe(time.perf_counter() - started)
+            flush_rows.observe(rows)
+            self.rows -= rows
+            buffered_rows.dec(rows)
+            self.space.set()
+
+        for batch, error in zip(batches, errors):
+            batch.resolve(error)
+
+    async def run(self) -> None:
+        while not (self.closing and len(self.batches) == 0):
+            await self.ready.wait()
+
+            if self.rows < settings.telemetry_write_rows and not self.closing:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self.full.wait(), settings.telemetry_write_interval
+                    )
+
+            await self.flush()
+
+    def start(self) -> None:
+        self.closing = False
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+
+        self.closing = True
+        self.ready.set()
+        await self.task
+        self.task = None
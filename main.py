@@ -1,29 +1,98 @@
+import argparse
+import asyncio
 import logging
+import socket
 
 import uvicorn
 from fastapi import FastAPI
+from uvicorn.supervisors import Multiprocess
 
 # isort: off
 import settings
 import models
 import database
+import pubsub
 import endpoints
 
 logging.basicConfig(level=logging.INFO)
 
 app = FastAPI()
+app.add_middleware(endpoints.metrics.MetricsMiddleware)
 app.include_router(endpoints.router)
+tasks: set[asyncio.Task[None]] = set()
 
 
 @app.on_event("startup")
 async def init() -> None:
-    async with database.engine.begin() as connection:
-        await connection.run_sync(database.Base.metadata.create_all)
+    async with database.engine.connect() as connection:
+        await database.partition.load(connection)
 
+    await pubsub.backend.start()
+    if settings.settings.telemetry_write_mode != "direct":
+        endpoints.telemetry.writer.start()
 
-uvicorn.run(
-    app,
-    host="0.0.0.0",
-    port=settings.settings.port,
-    root_path=settings.settings.root_path,
-)
+    tasks.add(asyncio.create_task(database.partition.run()))
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    for task in tasks:
+        task.cancel()
+
+    await endpoints.telemetry.writer.stop()
+    await pubsub.backend.stop()
+    await database.engine.dispose()
+
+
+class Server(uvicorn.Server):
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        for server in self.servers:
+            server.close()
+
+        await pubsub.drain(self.config.timeout_graceful_shutdown or 0)
+        await super().shutdown(sockets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the BrainyBoat server")
+    parser.add_argument("--host", default=settings.settings.host)
+    parser.add_argument("--port", type=int, default=settings.settings.port)
+    parser.add_argument("--workers", type=int, default=settings.settings.workers)
+    parser.add_argument(
+        "--loop",
+        choices=["auto", "asyncio", "uvloop"],
+        default=settings.settings.loop,
+    )
+    parser.add_argument(
+        "--http",
+        choices=["auto", "h11", "httptools"],
+        default=settings.settings.http,
+    )
+    args = parser.parse_args()
+
+    config = uvicorn.Config(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        root_path=settings.settings.root_path,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.settings.shutdown_timeout,
+    )
+    server = Server(config)
+
+    if config.workers > 1:
+        logging.warning(
+            "Running %s workers: each keeps its own metrics, so /metrics only "
+            "reports the worker that answers the scrape",
+            config.workers,
+        )
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import pydantic
-import json
+import orjson
 
 
 class BaseModel(pydantic.BaseModel):
@@ -8,9 +8,13 @@ class BaseModel(pydantic.BaseModel):
         allow_inf_nan = False
 
     def serializable(self) -> dict:
-        return json.loads(self.json())
+        return orjson.loads(self.dumps())
+
+    def dumps(self) -> str:
+        return orjson.dumps(self.dict()).decode("UTF-8")
 
 
 from . import user
 from . import ship
 from . import telemetry
+from . import fleet
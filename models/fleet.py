@@ -0,0 +1,19 @@
+from typing import Literal
+
+from models import BaseModel
+
+
+class Command(BaseModel):
+    action: Literal["subscribe", "unsubscribe"]
+    ships: list[int]
+
+
+class Subscription(BaseModel):
+    type: Literal["subscribed", "unsubscribed"]
+    ships: list[int]
+    missing: list[int] = []
+
+
+class Error(BaseModel):
+    type: Literal["error"] = "error"
+    detail: str
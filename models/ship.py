@@ -1,8 +1,10 @@
-from typing import Any
+from datetime import datetime
+from typing import Any, Literal, Self
 
 from pydantic import Field, validator
 
 from models import BaseModel
+from models.telemetry import Telemetry
 from models.user import User
 
 color_regex = r"^#(?i:[a-f0-9]{3}|[a-f0-9]{6})$"
@@ -17,6 +19,17 @@ class Ship(BaseModel):
 
     owner: User
 
+    @classmethod
+    def create(cls, ship: Any, owner: Any) -> Self:
+        return cls(
+            id=ship.id,
+            imai=ship.imai,
+            course=ship.course,
+            name=ship.name,
+            color=ship.color,
+            owner=User.from_orm(owner),
+        )
+
     @validator("imai")
     def values_validator(
         cls,
@@ -42,3 +55,62 @@ class AddShip(BaseModel):
     ) -> int:
         assert len(str(value)) == 8, "The imai must be 8 digits"
         return value
+
+
+class ShipState(BaseModel):
+    ship: Ship
+    telemetry: Telemetry | None
+
+    @classmethod
+    def create(cls, ship: Any, owner: Any, state: Any | None) -> Self:
+        return cls(
+            ship=Ship.create(ship, owner),
+            telemetry=None
+            if state is None
+            else Telemetry(
+                id=state.telemetry_id,
+                ship_id=state.ship_id,
+                datetime=state.datetime,
+                longitude=state.longitude,
+                latitude=state.latitude,
+                angle=state.angle,
+                temperature=state.temperature,
+                voltage=state.voltage,
+                velocity=state.velocity,
+            ),
+        )
+
+
+class CourseEvent(BaseModel):
+    type: Literal["deviation", "return", "arrival"]
+    telemetry_id: int
+    datetime: datetime
+    distance: float
+    progress: float
+    remaining: float
+
+
+class Trip(BaseModel):
+    start_telemetry_id: int
+    end_telemetry_id: int
+    departure: datetime
+    arrival: datetime
+    active: bool
+    points: int
+    distance: float
+    duration: float
+    mean_velocity: float
+    max_velocity: float
+    start_voltage: float
+    end_voltage: float
+    min_voltage: float
+    voltage_curve: list[float]
+
+
+class TripStats(BaseModel):
+    trips: int
+    distance: float
+    duration: float
+    mean_velocity: float
+    max_velocity: float
+    voltage_drain: float
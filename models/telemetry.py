@@ -1,4 +1,7 @@
+import base64
 from datetime import datetime
+from enum import Enum
+from typing import Any, Self
 
 from models import BaseModel
 
@@ -24,3 +27,83 @@ class AddTelemetry(BaseModel):
     temperature: float
     voltage: float
     velocity: float
+
+
+class TelemetryCount(BaseModel):
+    count: int
+
+
+class Cursor(BaseModel):
+    datetime: datetime
+    id: int
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.json().encode("UTF-8")).decode("UTF-8")
+
+    @classmethod
+    def decode(cls, cursor: str) -> Self:
+        return cls.parse_raw(base64.urlsafe_b64decode(cursor.encode("UTF-8")))
+
+
+class Aggregate(BaseModel):
+    min: float
+    max: float
+    avg: float
+
+
+class TelemetryBucket(BaseModel):
+    datetime: datetime
+    count: int
+    longitude: float
+    latitude: float
+    temperature: Aggregate
+    voltage: Aggregate
+    velocity: Aggregate
+
+
+class Resolution(str, Enum):
+    minute = "minute"
+    hour = "hour"
+    day = "day"
+
+
+class TelemetryRollup(BaseModel):
+    ship_id: int
+    resolution: Resolution
+    datetime: datetime
+    count: int
+    distance: float
+    temperature: Aggregate
+    voltage: Aggregate
+    velocity: Aggregate
+
+    @classmethod
+    def create(cls, rollup: Any) -> Self:
+        return cls(
+            ship_id=rollup.ship_id,
+            resolution=rollup.resolution,
+            datetime=rollup.bucket,
+            count=rollup.count,
+            distance=rollup.distance,
+            **{
+                name: Aggregate(
+                    min=getattr(rollup, f"{name}_min"),
+                    max=getattr(rollup, f"{name}_max"),
+                    avg=getattr(rollup, f"{name}_sum") / rollup.count,
+                )
+                for name in ("temperature", "voltage", "velocity")
+            },
+        )
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+class ImportFormat(str, Enum):
+    csv = "csv"
+    arrow = "arrow"
+    parquet = "parquet"
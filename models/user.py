@@ -1,4 +1,3 @@
-import hashlib
 from datetime import datetime
 from typing import Self
 
@@ -13,9 +12,6 @@ class Auth(BaseModel):
     username: str = Field(min_length=3)
     password: str = Field(min_length=8)
 
-    def get_password_hash(self, salt: str) -> str:
-        return hashlib.sha512((self.password + salt).encode("UTF-8")).hexdigest()
-
 
 class Token(BaseModel):
     id: int
@@ -53,6 +49,3 @@ class UpdateUsername(BaseModel):
 
 class UpdatePassword(BaseModel):
     password: str = Field(min_length=8)
-
-    def get_password_hash(self, salt: str) -> str:
-        return hashlib.sha512((self.password + salt).encode("UTF-8")).hexdigest()
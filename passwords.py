@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from settings import settings
+
+algorithm = "scrypt"
+executor = ThreadPoolExecutor(
+    settings.password_hash_workers,
+    thread_name_prefix="password",
+)
+pending = 0
+
+
+def derive(password: str, salt: str, n: int, r: int, p: int) -> str:
+    return hashlib.scrypt(
+        password.encode("UTF-8"),
+        salt=salt.encode("UTF-8"),
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r + 1024 * 1024,
+    ).hex()
+
+
+async def run(password: str, salt: str, n: int, r: int, p: int) -> str:
+    global pending
+
+    if pending >= settings.password_hash_queue:
+        raise HTTPException(503, "Too many password requests", {"Retry-After": "1"})
+
+    pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, derive, password, salt, n, r, p
+        )
+    finally:
+        pending -= 1
+
+
+async def hash(password: str, salt: str) -> str:
+    n, r, p = (
+        settings.password_hash_n,
+        settings.password_hash_r,
+        settings.password_hash_p,
+    )
+    return f"{algorithm}${n}${r}${p}${await run(password, salt, n, r, p)}"
+
+
+async def verify(password: str, salt: str, password_hash: str) -> bool:
+    if "$" not in password_hash:
+        legacy = hashlib.sha512((password + salt).encode("UTF-8")).hexdigest()
+        return hmac.compare_digest(legacy, password_hash)
+
+    name, n, r, p, digest = password_hash.split("$")
+    if name != algorithm:
+        return False
+
+    return hmac.compare_digest(
+        await run(password, salt, int(n), int(r), int(p)), digest
+    )
+
+
+def outdated(password_hash: str) -> bool:
+    n, r, p = (
+        settings.password_hash_n,
+        settings.password_hash_r,
+        settings.password_hash_p,
+    )
+    return not password_hash.startswith(f"{algorithm}${n}${r}${p}$")
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from asyncio import Event
+from collections import deque
+from itertools import count
+from typing import Awaitable, Callable, Iterator, Literal, NamedTuple
+
+from prometheus_client import REGISTRY, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from settings import settings
+
+Policy = Literal["drop_oldest", "disconnect", "latest"]
+
+
+class Message(NamedTuple):
+    channel: str
+    key: int
+    data: str
+
+
+class Subscriber:
+    def __init__(self, name: str, size: int, policy: Policy) -> None:
+        self.id = next(identifiers)
+        self.name = name
+        self.size = size
+        self.policy = policy
+        self.messages: deque[Message] = deque()
+        self.event = Event()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    @property
+    def lag(self) -> int:
+        return len(self.messages)
+
+    def put(self, message: Message) -> None:
+        if self.closed:
+            return
+
+        if len(self.messages) >= self.size:
+            if self.policy == "disconnect":
+                self.closed = True
+                self.dropped += 1
+                self.event.set()
+                return
+
+            if self.policy == "latest":
+                self.dropped += len(self.messages)
+                self.messages.clear()
+            else:
+                self.messages.popleft()
+                self.dropped += 1
+
+        self.messages.append(message)
+        self.event.set()
+
+    async def get(self) -> Message | None:
+        while len(self.messages) == 0:
+            if self.closed:
+                return None
+
+            self.event.clear()
+            await self.event.wait()
+
+        self.delivered += 1
+        return self.messages.popleft()
+
+    def close(self) -> None:
+        self.closed = True
+        self.event.set()
+
+        if self.dropped != 0:
+            logging.warning(
+                "Slow %s subscriber: %s delivered, %s dropped, %s lag",
+                self.name,
+                self.delivered,
+                self.dropped,
+                self.lag,
+            )
+
+
+class Pool:
+    def __init__(
+        self,
+        channel: str,
+        size: int,
+        policy: Policy,
+        reload: Callable[[int], Awaitable[str | None]] | None = None,
+        watch: Callable[[int, str], None] | None = None,
+    ) -> None:
+        self.channel = channel
+        self.size = size
+        self.policy = policy
+        self.reload = reload
+        self.watch = watch
+        self.subscribers: dict[int, set[Subscriber]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        pools[channel] = self
+
+    def subscribe(self, key: int, subscriber: Subscriber | None = None) -> Subscriber:
+        if subscriber is None:
+            subscriber = Subscriber(f"{self.channel} {key}", self.size, self.policy)
+
+        self.subscribers.setdefault(key, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, key: int, subscriber: Subscriber) -> None:
+        if key not in self.subscribers:
+            return
+
+        self.subscribers[key].discard(subscriber)
+        if len(self.subscribers[key]) == 0:
+            self.subscribers.pop(key)
+
+    def close(self) -> None:
+        for keyed in self.subscribers.values():
+            for subscriber in keyed:
+                subscriber.close()
+
+    def deliver(self, key: int, data: str) -> None:
+        if self.watch is not None:
+            self.watch(key, data)
+
+        message = Message(self.channel, key, data)
+        for subscriber in self.subscribers.get(key, ()):
+            dropped = subscriber.dropped
+            subscriber.put(message)
+            self.delivered += 1
+            self.dropped += subscriber.dropped - dropped
+
+    async def publish(
+        self,
+        key: int,
+        message: str,
+        session: AsyncSession | None = None,
+    ) -> None:
+        await self.publish_many([(key, message)], session)
+
+    async def publish_many(
+        self,
+        messages: list[tuple[int, str]],
+        session: AsyncSession | None = None,
+    ) -> None:
+        if len(messages) == 0:
+            return
+
+        start = time.perf_counter()
+        await backend.publish(self, messages, session)
+        self.published += len(messages)
+        publish_seconds.labels(self.channel).observe(time.perf_counter() - start)
+
+
+class Backend(ABC):
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(
+        self,
+        pool: Pool,
+        messages: list[tuple[int, str]],
+        session: AsyncSession | None,
+    ) -> None:
+        pass
+
+
+class PoolCollector(Collector):
+    def collect(self) -> Iterator[GaugeMetricFamily | CounterMetricFamily]:
+        subscribers = GaugeMetricFamily(
+            "brainyboat_pubsub_subscribers",
+            "Live subscribers per pool",
+            labels=["channel"],
+        )
+        lag = GaugeMetricFamily(
+            "brainyboat_pubsub_lag",
+            "Messages queued for live subscribers per pool",
+            labels=["channel"],
+        )
+        published = CounterMetricFamily(
+            "brainyboat_pubsub_published",
+            "Messages published per pool",
+            labels=["channel"],
+        )
+        delivered = CounterMetricFamily(
+            "brainyboat_pubsub_delivered",
+            "Messages handed to subscribers per pool",
+            labels=["channel"],
+        )
+        dropped = CounterMetricFamily(
+            "brainyboat_pubsub_dropped",
+            "Messages dropped for slow subscribers per pool",
+            labels=["channel"],
+        )
+
+        subscriber_lag = GaugeMetricFamily(
+            "brainyboat_pubsub_subscriber_lag",
+            "Messages queued for each live subscriber",
+            labels=["subscriber"],
+        )
+        subscriber_delivered = CounterMetricFamily(
+            "brainyboat_pubsub_subscriber_delivered",
+            "Messages handed to each live subscriber",
+            labels=["subscriber"],
+        )
+        subscriber_dropped = CounterMetricFamily(
+            "brainyboat_pubsub_subscriber_dropped",
+            "Messages dropped for each live subscriber",
+            labels=["subscriber"],
+        )
+
+        live: dict[int, Subscriber] = {}
+        for channel, pool in pools.items():
+            members = [
+                subscriber
+                for keyed in pool.subscribers.values()
+                for subscriber in keyed
+            ]
+            subscribers.add_metric([channel], len(members))
+            lag.add_metric([channel], sum(subscriber.lag for subscriber in members))
+            published.add_metric([channel], pool.published)
+            delivered.add_metric([channel], pool.delivered)
+            dropped.add_metric([channel], pool.dropped)
+            live.update((subscriber.id, subscriber) for subscriber in members)
+
+        for subscriber in live.values():
+            label = [f"{subscriber.name} #{subscriber.id}"]
+            subscriber_lag.add_metric(label, subscriber.lag)
+            subscriber_delivered.add_metric(label, subscriber.delivered)
+            subscriber_dropped.add_metric(label, subscriber.dropped)
+
+        yield from (
+            subscribers,
+            lag,
+            published,
+            delivered,
+            dropped,
+            subscriber_lag,
+            subscriber_delivered,
+            subscriber_dropped,
+        )
+
+
+async def drain(timeout: float) -> None:
+    for pool in pools.values():
+        pool.close()
+
+    deadline = time.monotonic() + timeout
+    while any(len(pool.subscribers) != 0 for pool in pools.values()):
+        if time.monotonic() >= deadline:
+            logging.warning("Subscribers still open after %s seconds", timeout)
+            return
+
+        await asyncio.sleep(0.05)
+
+
+pools: dict[str, Pool] = {}
+identifiers = count(1)
+publish_seconds = Histogram(
+    "brainyboat_pubsub_publish_seconds",
+    "Time spent publishing a batch of messages",
+    ["channel"],
+)
+REGISTRY.register(PoolCollector())
+
+from . import memory
+from . import postgres
+
+backend: Backend = {
+    "memory": memory.MemoryBackend,
+    "postgres": postgres.PostgresBackend,
+}[settings.pubsub]()
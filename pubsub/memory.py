@@ -0,0 +1,21 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from pubsub import Backend, Pool
+
+
+class MemoryBackend(Backend):
+    def deliver(self, pool: Pool, messages: list[tuple[int, str]]) -> None:
+        for key, message in messages:
+            pool.deliver(key, message)
+
+    async def publish(
+        self,
+        pool: Pool,
+        messages: list[tuple[int, str]],
+        session: AsyncSession | None,
+    ) -> None:
+        if session is None:
+            self.deliver(pool, messages)
+        else:
+            database.commit.on_commit(session, lambda: self.deliver(pool, messages))
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Any
+
+from sqlalchemy import Text, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from pubsub import Backend, Pool, pools
+
+payload_limit = 8000
+reconnect_delay = 1.0
+
+
+class PostgresBackend(Backend):
+    prefix = "brainyboat_"
+
+    def __init__(self) -> None:
+        self.listener: asyncio.Task[None] | None = None
+        self.reloads: set[asyncio.Task[None]] = set()
+
+    async def start(self) -> None:
+        self.listener = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self.listener is not None:
+            self.listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.listener
+            self.listener = None
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                async with database.engine.connect() as connection:
+                    raw_connection = await connection.get_raw_connection()
+                    driver_connection: Any = raw_connection.driver_connection
+                    closed = asyncio.Event()
+                    driver_connection.add_termination_listener(lambda _: closed.set())
+
+                    channels = [self.prefix + channel for channel in pools]
+                    try:
+                        for channel in channels:
+                            await driver_connection.add_listener(channel, self.notify)
+                        await closed.wait()
+                    finally:
+                        if not driver_connection.is_closed():
+                            for channel in channels:
+                                await driver_connection.remove_listener(
+                                    channel, self.notify
+                                )
+            except Exception:
+                logging.exception("Listening for notifications failed")
+
+            await asyncio.sleep(reconnect_delay)
+
+    def notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        pool = pools[channel.removeprefix(self.prefix)]
+        key, _, message = payload.partition(" ")
+
+        if message != "":
+            pool.deliver(int(key), message)
+        elif pool.reload is not None:
+            task = asyncio.create_task(self.reload(pool, int(key)))
+            self.reloads.add(task)
+            task.add_done_callback(self.reloads.discard)
+
+    async def reload(self, pool: Pool, key: int) -> None:
+        assert pool.reload is not None
+
+        message = await pool.reload(key)
+        if message is not None:
+            pool.deliver(key, message)
+
+    async def publish(
+        self,
+        pool: Pool,
+        messages: list[tuple[int, str]],
+        session: AsyncSession | None,
+    ) -> None:
+        payloads = []
+        for key, message in messages:
+            payload = f"{key} {message}"
+            if len(payload.encode("UTF-8")) >= payload_limit:
+                if pool.reload is None:
+                    logging.warning(
+                        "Dropped %s message for %s: payload is too large",
+                        pool.channel,
+                        key,
+                    )
+                    continue
+                payload = str(key)
+            payloads.append(payload)
+
+        if len(payloads) == 0:
+            return
+
+        notifications = (
+            func.unnest(bindparam("payloads", payloads, type_=ARRAY(Text)))
+            .table_valued("payload", with_ordinality="position")
+            .render_derived()
+        )
+
+        statement = select(
+            func.pg_notify(self.prefix + pool.channel, notifications.c.payload)
+        ).order_by(notifications.c.position)
+
+        if session is not None:
+            await session.execute(statement)
+            return
+
+        async with database.engine.begin() as connection:
+            await connection.execute(statement)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseSettings, PostgresDsn
 
 
@@ -7,5 +9,62 @@ class Settings(BaseSettings):
     port: int
     root_path: str
 
+    host: str = "0.0.0.0"
+    workers: int = 1
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    shutdown_timeout: int = 10
+
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = -1
+    database_pool_pre_ping: bool = False
+    database_statement_cache_size: int = 100
+
+    user_cache_size: int = 1024
+    user_cache_ttl: float = 60
+
+    password_hash_n: int = 16384
+    password_hash_r: int = 8
+    password_hash_p: int = 1
+    password_hash_workers: int = 2
+    password_hash_queue: int = 32
+
+    pubsub: Literal["memory", "postgres"] = "memory"
+    telemetry_queue_size: int = 1024
+    telemetry_queue_policy: Literal["drop_oldest", "disconnect"] = "drop_oldest"
+    course_queue_size: int = 1
+    course_cache_size: int = 1024
+    course_cache_ttl: float = 60
+    course_deviation_distance: float = 100
+    course_arrival_distance: float = 50
+
+    telemetry_retention_months: int | None = None
+    telemetry_backfill_months: int = 120
+
+    ingest_batch_size: int = 500
+    ingest_flush_interval: float = 1.0
+
+    telemetry_write_mode: Literal[
+        "direct", "group_commit", "fire_and_forget"
+    ] = "direct"
+    telemetry_write_interval: float = 0.01
+    telemetry_write_rows: int = 1000
+    telemetry_write_buffer: int = 10000
+    telemetry_write_id_block: int = 1000
+
+    trip_moving_velocity: float = 0.5
+    trip_dwell_time: float = 600
+    trip_min_points: int = 2
+    trip_curve_points: int = 16
+    trip_chunk_size: int = 100000
+    trip_refresh_overlap: float = 60
+    trip_cache_size: int = 256
+    trip_cache_ttl: float = 3600
+
+    columnar_batch_size: int = 65536
+    import_spool_size: int = 64 * 1024 * 1024
+
 
 settings = Settings()
@@ -0,0 +1,8 @@
+import pytest
+
+import benchmarks.environment
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
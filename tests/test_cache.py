@@ -0,0 +1,75 @@
+import pytest
+
+from endpoints import cache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(cache, "caches", {})
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_expiry(clock: Clock) -> None:
+    items: cache.TTLCache[int, str] = cache.TTLCache("test_expiry", 4, 10)
+    items.set(1, "one")
+
+    clock.now = 10
+    assert items.get(1) == "one"
+
+    clock.now = 10.5
+    assert items.get(1) is None
+    assert 1 not in items.items
+    assert (items.hits, items.misses) == (1, 1)
+
+
+def test_sliding(clock: Clock) -> None:
+    items: cache.TTLCache[int, str] = cache.TTLCache("test_sliding", 4, 10, True)
+    items.set(1, "one")
+
+    for now in (8, 16, 24):
+        clock.now = now
+        assert items.get(1) == "one"
+
+    clock.now = 35
+    assert items.get(1) is None
+
+
+def test_eviction(clock: Clock) -> None:
+    items: cache.TTLCache[int, str] = cache.TTLCache("test_eviction", 2, 10)
+    items.set(1, "one")
+    items.set(2, "two")
+    items.get(1)
+    items.set(3, "three")
+
+    assert list(items.items) == [1, 3]
+
+
+def test_disabled(clock: Clock) -> None:
+    items: cache.TTLCache[int, str] = cache.TTLCache("test_disabled", 0, 10)
+    items.set(1, "one")
+
+    assert items.get(1) is None
+
+
+def test_remove(clock: Clock) -> None:
+    items: cache.TTLCache[tuple[int, int], str] = cache.TTLCache("test_remove", 4, 10)
+    items.set((1, 1), "a")
+    items.set((1, 2), "b")
+    items.set((2, 1), "c")
+    items.remove(lambda key: key[0] == 1)
+
+    assert list(items.items) == [(2, 1)]
@@ -0,0 +1,66 @@
+import numpy as np
+
+from analytics import cell
+
+
+def compact(value: int) -> int:
+    value &= 0x55555555
+    for shift, mask in (
+        (1, 0x33333333),
+        (2, 0x0F0F0F0F),
+        (4, 0x00FF00FF),
+        (8, 0x0000FFFF),
+    ):
+        value = (value | (value >> shift)) & mask
+    return value
+
+
+def decode(value: int) -> tuple[int, int]:
+    return compact(value), compact(value >> 1)
+
+
+def test_round_trip() -> None:
+    generator = np.random.default_rng(0)
+    for longitude, latitude in generator.uniform((-180, -90), (180, 90), (1000, 2)):
+        assert decode(cell.encode(longitude, latitude)) == (
+            cell.quantize(longitude, -180, 180),
+            cell.quantize(latitude, -90, 90),
+        )
+
+
+def test_quantize_bounds() -> None:
+    assert cell.quantize(-180, -180, 180) == 0
+    assert cell.quantize(180, -180, 180) == (1 << cell.bits) - 1
+    assert decode(cell.encode(180, 90)) == ((1 << cell.bits) - 1,) * 2
+
+
+def contains(ranges: list[tuple[int, int]], value: int) -> bool:
+    return any(low <= value <= high for low, high in ranges)
+
+
+def test_cover() -> None:
+    generator = np.random.default_rng(1)
+    for west, south, east, north in (
+        (30.1, 59.8, 30.5, 60.1),
+        (-10, -10, 10, 10),
+        (170, -5, -170, 5),
+    ):
+        ranges = cell.cover(west, south, east, north)
+        assert len(ranges) <= 32
+        assert ranges == cell.merge(ranges)
+
+        width = (east - west) % 360
+        for offset, latitude in generator.uniform((0, south), (width, north), (500, 2)):
+            longitude = (west + offset + 180) % 360 - 180
+            assert contains(ranges, cell.encode(longitude, latitude))
+
+
+def test_around() -> None:
+    west, south, east, north = cell.around(179.9, 0, 50000)
+
+    assert west > east
+    assert south < 0 < north
+
+    west, south, east, north = cell.around(0, 89.9, 50000)
+    assert (west, east, north) == (-180, 180, 90)
+    assert south < 89.9
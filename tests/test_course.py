@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import analytics
+from analytics.course import Course
+
+
+def test_locate_straight() -> None:
+    course = Course([(0, 0), (1, 0)])
+    position = course.locate(0.5, 0.01)
+
+    assert position.distance == pytest.approx(
+        analytics.haversine(0.5, 0, 0.5, 0.01), rel=1e-6
+    )
+    assert position.progress == pytest.approx(0.5)
+    assert course.locate(-1, 0).progress == 0
+    assert course.locate(2, 0).progress == 1
+    assert course.locate(1, 0).remaining == pytest.approx(0, abs=1e-6)
+
+
+def test_locate_matches_nearest() -> None:
+    generator = np.random.default_rng(0)
+    waypoints = [
+        (30 + float(x), 60 + float(y))
+        for x, y in np.cumsum(generator.normal(0, 0.05, (40, 2)), axis=0)
+    ]
+    course = Course(waypoints)
+
+    for longitude, latitude in generator.uniform((29, 59), (32, 62), (500, 2)):
+        position = course.locate(longitude, latitude)
+        distance, along = course.nearest(*course.project(longitude, latitude))
+
+        assert position.distance == pytest.approx(distance, abs=1e-6)
+        assert position.progress * course.length == pytest.approx(along, abs=1e-6)
+
+
+def test_locate_antimeridian() -> None:
+    course = Course([(179, 0), (-179, 0)])
+    position = course.locate(180, 0.01)
+
+    assert course.length == pytest.approx(
+        analytics.haversine(179, 0, -179, 0), rel=1e-3
+    )
+    assert position.progress == pytest.approx(0.5)
+    assert position.distance == pytest.approx(
+        analytics.haversine(180, 0, 180, 0.01), rel=1e-3
+    )
+
+
+def test_locate_single_waypoint() -> None:
+    course = Course([(30, 60)])
+    position = course.locate(30, 60.01)
+
+    assert course.length == 0
+    assert position.progress == 1
+    assert position.distance == pytest.approx(position.remaining)
@@ -0,0 +1,69 @@
+import pytest
+
+import pubsub
+
+
+def put(subscriber: pubsub.Subscriber, *keys: int) -> None:
+    for key in keys:
+        subscriber.put(pubsub.Message("test", key, str(key)))
+
+
+async def drain(subscriber: pubsub.Subscriber) -> list[int]:
+    keys = []
+    while len(subscriber.messages) != 0:
+        message = await subscriber.get()
+        assert message is not None
+        keys.append(message.key)
+
+    return keys
+
+
+@pytest.mark.anyio
+async def test_drop_oldest() -> None:
+    subscriber = pubsub.Subscriber("test", 3, "drop_oldest")
+    put(subscriber, 1, 2, 3, 4, 5)
+
+    assert subscriber.lag == 3
+    assert await drain(subscriber) == [3, 4, 5]
+    assert (subscriber.delivered, subscriber.dropped) == (3, 2)
+    assert not subscriber.closed
+
+
+@pytest.mark.anyio
+async def test_disconnect() -> None:
+    subscriber = pubsub.Subscriber("test", 3, "disconnect")
+    put(subscriber, 1, 2, 3, 4, 5)
+
+    assert subscriber.closed
+    assert subscriber.dropped == 1
+    assert await drain(subscriber) == [1, 2, 3]
+    assert await subscriber.get() is None
+
+
+@pytest.mark.anyio
+async def test_latest() -> None:
+    subscriber = pubsub.Subscriber("test", 3, "latest")
+    put(subscriber, 1, 2, 3)
+    assert subscriber.dropped == 0
+
+    put(subscriber, 4)
+    assert await drain(subscriber) == [4]
+    assert subscriber.dropped == 3
+
+
+@pytest.mark.anyio
+async def test_close() -> None:
+    subscriber = pubsub.Subscriber("test", 3, "drop_oldest")
+    put(subscriber, 1)
+    subscriber.close()
+    put(subscriber, 2)
+
+    assert await drain(subscriber) == [1]
+    assert await subscriber.get() is None
+
+
+def test_identifiers() -> None:
+    first = pubsub.Subscriber("test", 1, "latest")
+    second = pubsub.Subscriber("test", 1, "latest")
+
+    assert second.id > first.id > 0
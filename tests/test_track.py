@@ -0,0 +1,80 @@
+import numpy as np
+import numpy.typing as npt
+
+import analytics
+from analytics import track
+
+
+def reference(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    start: int,
+    end: int,
+    tolerance: float,
+) -> list[int]:
+    if end - start < 2:
+        return []
+
+    distance = np.sqrt(
+        track.segment_distance_squared(
+            x[start + 1 : end] - x[start],
+            y[start + 1 : end] - y[start],
+            np.full(end - start - 1, x[end] - x[start]),
+            np.full(end - start - 1, y[end] - y[start]),
+        )
+    )
+    index = int(distance.argmax())
+    if distance[index] < tolerance:
+        return []
+
+    split = start + 1 + index
+    return [
+        *reference(x, y, start, split, tolerance),
+        split,
+        *reference(x, y, split, end, tolerance),
+    ]
+
+
+def get_walk(count: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    generator = np.random.default_rng(seed)
+    longitude = 30 + np.cumsum(generator.normal(0, 0.001, count))
+    latitude = 60 + np.cumsum(generator.normal(0, 0.001, count))
+    return longitude, latitude
+
+
+def test_douglas_peucker() -> None:
+    for seed in range(5):
+        longitude, latitude = get_walk(500, seed)
+        x, y = analytics.project(longitude, latitude)
+
+        for tolerance in (10.0, 50.0, 200.0):
+            expected = [0, *reference(x, y, 0, len(x) - 1, tolerance), len(x) - 1]
+            assert track.simplify(longitude, latitude, tolerance).tolist() == expected
+
+
+def test_straight_line() -> None:
+    longitude = np.linspace(30, 31, 50)
+    latitude = np.full(50, 60.0)
+
+    assert track.simplify(longitude, latitude, 1).tolist() == [0, 49]
+
+
+def test_points() -> None:
+    longitude, latitude = get_walk(1000, 42)
+    weights = track.importance(longitude, latitude)
+
+    for points in (2, 10, 100):
+        keep = track.simplify(longitude, latitude, points=points)
+        assert len(keep) == points
+        assert keep[0] == 0 and keep[-1] == 999
+        assert weights[keep].min() >= np.delete(weights, keep).max()
+
+
+def test_small() -> None:
+    empty = np.array([], dtype=np.float64)
+
+    assert track.simplify(empty, empty, 10).tolist() == []
+    assert track.simplify(np.array([30.0]), np.array([60.0]), 10).tolist() == [0]
+    assert track.simplify(
+        np.array([30.0, 30.1]), np.array([60.0, 60.1]), 10
+    ).tolist() == [0, 1]
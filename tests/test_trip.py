@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import analytics
+from analytics import trip
+
+
+def get_samples(velocity: list[float], interval: float = 10) -> np.ndarray:
+    samples = np.zeros(len(velocity), trip.sample_dtype)
+    samples["id"] = np.arange(1, len(velocity) + 1)
+    samples["time"] = np.arange(len(velocity)) * int(interval * 1e6)
+    samples["longitude"] = 30 + np.arange(len(velocity)) * 0.001
+    samples["latitude"] = 60
+    samples["velocity"] = velocity
+    samples["voltage"] = 13 - np.arange(len(velocity)) * 0.1
+    return samples
+
+
+def test_segment_dwell() -> None:
+    samples = get_samples([0, 2, 2, 0, 0, 2, 2, 0])
+
+    starts, ends = trip.segment(samples["time"], samples["velocity"], 1, 15)
+    assert (starts.tolist(), ends.tolist()) == ([1, 5], [2, 6])
+
+    starts, ends = trip.segment(samples["time"], samples["velocity"], 1, 60)
+    assert (starts.tolist(), ends.tolist()) == ([1], [6])
+
+
+def test_segment_threshold() -> None:
+    samples = get_samples([0.5, 1, 0.99, 3, 0])
+    starts, ends = trip.segment(samples["time"], samples["velocity"], 1, 5)
+
+    assert (starts.tolist(), ends.tolist()) == ([1, 3], [1, 3])
+
+
+def test_segment_idle() -> None:
+    samples = get_samples([0, 0.5, 0])
+    starts, ends = trip.segment(samples["time"], samples["velocity"], 1, 60)
+
+    assert len(starts) == len(ends) == 0
+    assert len(trip.summarize(samples, starts, ends, 4)) == 0
+
+
+def test_summarize() -> None:
+    samples = get_samples([0, 2, 4, 0, 0, 1, 3, 0])
+    starts, ends = trip.segment(samples["time"], samples["velocity"], 1, 15)
+    trips = trip.summarize(samples, starts, ends, 3)
+
+    assert trips["start_id"].tolist() == [2, 6]
+    assert trips["end_id"].tolist() == [3, 7]
+    assert trips["departure"].tolist() == [10_000_000, 50_000_000]
+    assert trips["arrival"].tolist() == [20_000_000, 60_000_000]
+    assert trips["points"].tolist() == [2, 2]
+    assert trips["mean_velocity"].tolist() == [3, 2]
+    assert trips["max_velocity"].tolist() == [4, 3]
+    assert trips["start_voltage"] == pytest.approx([12.9, 12.5])
+    assert trips["end_voltage"] == pytest.approx([12.8, 12.4])
+    assert trips["min_voltage"] == pytest.approx([12.8, 12.4])
+    assert trips["voltage_curve"][0] == pytest.approx([12.9, 12.85, 12.8])
+    assert trips["distance"] == pytest.approx(
+        analytics.haversine(30.001, 60, 30.002, 60), rel=1e-9
+    )
@@ -0,0 +1,102 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import pytest
+
+from endpoints import writer
+
+
+class Sessions:
+    def __init__(self) -> None:
+        self.committed: list[list[dict[str, Any]]] = []
+
+    @asynccontextmanager
+    async def begin(self) -> AsyncIterator[list[dict[str, Any]]]:
+        values: list[dict[str, Any]] = []
+        yield values
+        self.committed.append(values)
+
+
+class Write:
+    def __init__(self) -> None:
+        self.calls: list[list[int]] = []
+
+    async def __call__(self, session: Any, values: list[dict[str, Any]]) -> None:
+        self.calls.append([value["id"] for value in values])
+        if any(value.get("bad") for value in values):
+            raise ValueError("bad row")
+
+        session.extend(values)
+
+
+@pytest.fixture
+def sessions(monkeypatch: pytest.MonkeyPatch) -> Sessions:
+    sessions = Sessions()
+    monkeypatch.setattr(writer.database, "sessions", sessions)
+    return sessions
+
+
+def get_batch(*ids: int, bad: bool = False) -> writer.Batch:
+    return writer.Batch([{"id": id, "bad": bad} for id in ids], True)
+
+
+@pytest.mark.anyio
+async def test_commit_group(sessions: Sessions) -> None:
+    write = Write()
+    batches = [get_batch(1, 2), get_batch(3)]
+
+    assert await writer.Writer(write).commit(batches) == [None, None]
+    assert write.calls == [[1, 2, 3]]
+    assert len(sessions.committed) == 1
+
+
+@pytest.mark.anyio
+async def test_commit_isolates_failures(sessions: Sessions) -> None:
+    write = Write()
+    batches = [get_batch(1, 2), get_batch(3, bad=True), get_batch(4)]
+
+    errors = await writer.Writer(write).commit(batches)
+
+    assert errors[0] is None
+    assert isinstance(errors[1], ValueError)
+    assert errors[2] is None
+    assert write.calls == [[1, 2, 3, 4], [1, 2], [3], [4]]
+    assert [[value["id"] for value in values] for values in sessions.committed] == [
+        [1, 2],
+        [4],
+    ]
+
+
+@pytest.mark.anyio
+async def test_flush_resolves_batches(sessions: Sessions) -> None:
+    write = Write()
+    target = writer.Writer(write)
+    target.ids.extend(range(1, 10))
+    target.start()
+
+    good = await target.submit([{}, {}], True)
+    bad = await target.submit([{"bad": True}], True)
+    fire = await target.submit([{}], False)
+    await target.stop()
+
+    assert good.committed is not None and good.committed.result() is None
+    assert bad.committed is not None
+    with pytest.raises(ValueError):
+        bad.committed.result()
+    assert fire.committed is None
+    assert target.rows == 0
+    assert sorted(value["id"] for values in sessions.committed for value in values) == [
+        1,
+        2,
+        4,
+    ]
+
+
+@pytest.mark.anyio
+async def test_submit_requires_running_writer() -> None:
+    target = writer.Writer(Write())
+
+    with pytest.raises(writer.HTTPException) as error:
+        await target.submit([{}], True)
+
+    assert error.value.status_code == 503